@@ -0,0 +1,98 @@
+"""
+Vectorized board evaluation for Python Tetris.
+This module scores stacks of candidate boards at once with NumPy, using
+the features and weights of heuristic_agent.evaluate_board.
+"""
+
+import numpy as np
+from game import WALL_PAD
+from heuristic_agent import get_placements, make_move
+
+def evaluate_boards(boards):
+    """
+    Evaluate a stack of column-major boards.
+    Gives exactly the scores of evaluate_board for each board.
+
+    Args:
+        boards (array): (N, width, height) array, nonzero where a cell is occupied
+
+    Returns:
+        ndarray: (N,) array of heuristic scores
+    """
+    occupied = np.asarray(boards) != 0
+    n, width, height = occupied.shape
+
+    # The highest block of a column is its first occupied cell from the top
+    column_heights = np.where(occupied.any(axis=2), height - np.argmax(occupied, axis=2), 0)
+    aggregate_height = column_heights.sum(axis=1)
+    complete_lines = occupied.all(axis=1).sum(axis=1)
+    # Every empty cell below the highest block of a column is a hole
+    holes = aggregate_height - occupied.sum(axis=(1, 2))
+    bumpiness = np.abs(np.diff(column_heights, axis=1)).sum(axis=1)
+
+    return -0.51 * aggregate_height + 0.76 * complete_lines - 0.36 * holes - 0.18 * bumpiness
+
+def evaluate_bitboards(rows, width=10):
+    """
+    Evaluate a stack of bitboards in the layout of Game.bitboard.
+    Gives exactly the scores of evaluate_board for each board.
+
+    Args:
+        rows (array): (N, height) integer array of bitboard rows, wall bits
+            included and floor rows left out
+        width (int): Width of the boards
+
+    Returns:
+        ndarray: (N,) array of heuristic scores
+    """
+    rows = (np.asarray(rows, dtype=np.int64) >> WALL_PAD) & ((1 << width) - 1)
+    cells = (rows[:, None, :] >> np.arange(width)[None, :, None]) & 1
+    return evaluate_boards(cells)
+
+def select_best_move_batched(game, piece, next_piece, placements=get_placements):
+    """
+    Select the best move like select_best_move_inplace, scoring all the
+    boards of the second ply in one batch.
+    The bitboard of every second-ply board is collected on a scratch board
+    and the whole stack is evaluated with evaluate_bitboards. Ties go to the
+    earliest generated move.
+
+    Args:
+        game (Game): The game object
+        piece (dict): The current piece
+        next_piece (dict): The next piece
+        placements (function): Placement generator, get_placements or
+            get_reachable_placements
+
+    Returns:
+        dict: The best move for the current piece, without a 'board' entry
+    """
+    board = game.clone()
+    roots = []
+    leaves = []  # Bitboard of every second-ply board
+    leaf_roots = []  # Index in roots of the first move of each leaf
+
+    token = board.snapshot()
+    for dir, x, y in placements(board, piece):
+        roots.append((dir, x, y))
+        board.place(piece['type'], x, y, dir, clear_lines=False)
+        next_token = board.snapshot()
+
+        for next_dir, next_x, next_y in placements(board, next_piece):
+            board.place(next_piece['type'], next_x, next_y, next_dir, clear_lines=False)
+            leaves.append(board.bitboard[:board.height])
+            leaf_roots.append(len(roots) - 1)
+            board.restore(next_token)
+
+        board.release(next_token)
+        board.restore(token)
+    board.release(token)
+
+    if leaves:
+        # argmax returns the first of equal scores
+        best = int(np.argmax(evaluate_bitboards(leaves, game.width)))
+        return make_move(piece, *roots[leaf_roots[best]])
+    elif roots:  # Fallback if no next moves
+        return make_move(piece, *roots[0])
+    else:
+        return None  # No valid moves
@@ -0,0 +1,212 @@
+"""
+Vectorized multi-game environment for Python Tetris.
+This module steps many headless games at once using NumPy row bitmasks.
+"""
+
+import numpy as np
+from tetromino import ALL_PIECES, UP
+from game import WALL_PAD, FLOOR_ROWS
+
+# Row masks of every piece and rotation as a (piece, dir, row) array,
+# with zeros for the empty rows of the 4x4 piece box
+PIECE_ROW_MASKS = np.zeros((len(ALL_PIECES), 4, 4), dtype=np.int64)
+for _index, _piece in enumerate(ALL_PIECES):
+    for _dir in range(4):
+        for _row, _mask in _piece.row_masks[_dir]:
+            PIECE_ROW_MASKS[_index, _dir, _row] = _mask
+PIECE_SIZES = np.array([piece.size for piece in ALL_PIECES], dtype=np.int64)
+
+class BatchGame:
+    """
+    Holds N independent headless games and advances all of them per call.
+
+    Boards are stored as an (N, height + FLOOR_ROWS) array of row bitmasks
+    in the layout of Game.bitboard, full floor rows included. Pieces are
+    indices into ALL_PIECES. Scoring follows Game: 10 points per lock and
+    100 * 2 ** (lines - 1) per clear.
+    """
+
+    def __init__(self, num_games, width=10, height=20, seed=None):
+        """
+        Initialize a batch of Tetris games.
+
+        Args:
+            num_games (int): Number of games in the batch
+            width (int): Width of each board in blocks
+            height (int): Height of each board in blocks
+            seed (int, optional): Seed for the batch random generator
+        """
+        self.num_games = num_games
+        self.width = width
+        self.height = height
+        self.full_row = (1 << (width + 2 * WALL_PAD)) - 1
+        self.empty_row = self.full_row ^ (((1 << width) - 1) << WALL_PAD)
+        self.rng = np.random.default_rng(seed)
+
+        self.boards = np.empty((num_games, height + FLOOR_ROWS), dtype=np.int64)
+        self.score = np.zeros(num_games, dtype=np.int64)
+        self.rows = np.zeros(num_games, dtype=np.int64)
+        self.pieces_placed = np.zeros(num_games, dtype=np.int64)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.bags = np.empty((num_games, len(ALL_PIECES) * 4), dtype=np.int64)
+        self.bag_remaining = np.zeros(num_games, dtype=np.int64)
+        self.current_piece = np.zeros(num_games, dtype=np.int64)
+        self.current_x = np.zeros(num_games, dtype=np.int64)
+        self.next_piece = np.zeros(num_games, dtype=np.int64)
+        self.next_x = np.zeros(num_games, dtype=np.int64)
+        self.reset()
+
+    def reset(self, games=None):
+        """
+        Reset games to their initial state.
+
+        Args:
+            games (array, optional): Boolean mask or indices of the games to reset.
+                Defaults to all games.
+        """
+        if games is None:
+            games = np.arange(self.num_games)
+        games = np.arange(self.num_games)[games]
+
+        self.boards[games, :self.height] = self.empty_row
+        self.boards[games, self.height:] = self.full_row
+        self.score[games] = 0
+        self.rows[games] = 0
+        self.pieces_placed[games] = 0
+        self.game_over[games] = False
+        self.bag_remaining[games] = 0
+
+        self.next_piece[games], self.next_x[games] = self._random_pieces(games)
+        self.current_piece[games], self.current_x[games] = self._random_pieces(games)
+
+    def _random_pieces(self, games):
+        """
+        Draw the next piece from each game's bag.
+        Empty bags are refilled with 4 of each piece, like Game._random_piece.
+
+        Args:
+            games (ndarray): Indices of the games to draw for
+
+        Returns:
+            tuple: (pieces, xs) arrays of piece indices and spawn columns
+        """
+        empty = games[self.bag_remaining[games] == 0]
+        if len(empty):
+            bag = np.tile(np.arange(len(ALL_PIECES)), 4)
+            self.bags[empty] = self.rng.permuted(np.broadcast_to(bag, (len(empty), len(bag))), axis=1)
+            self.bag_remaining[empty] = len(bag)
+
+        self.bag_remaining[games] -= 1
+        pieces = self.bags[games, self.bag_remaining[games]]
+        xs = self.rng.integers(0, self.width - PIECE_SIZES[pieces] + 1)
+        return pieces, xs
+
+    def _collisions(self, games, pieces, dirs, xs, depth=None):
+        """
+        Test pieces against their boards at the top row offsets.
+
+        Args:
+            games (ndarray): Indices of the games to test
+            pieces (ndarray): Piece index per game
+            dirs (ndarray): Rotation direction per game
+            xs (ndarray): X position per game
+            depth (int, optional): Number of y offsets to test, starting at 0.
+                Defaults to height + 1, enough to always reach the floor.
+
+        Returns:
+            ndarray: (len(games), depth) boolean array, True where
+                the piece would be occupied with its top row at that y
+        """
+        if depth is None:
+            depth = self.height + 1
+        shifts = xs + WALL_PAD
+        off_board = (shifts < 0) | (xs >= self.width)
+        masks = PIECE_ROW_MASKS[pieces, dirs] << np.clip(shifts, 0, self.width + WALL_PAD)[:, None]
+        boards = self.boards[games]
+
+        occupied = np.zeros((len(games), depth), dtype=bool)
+        for row in range(4):
+            occupied |= (boards[:, row:row + depth] & masks[:, row, None]) != 0
+        occupied[off_board] = True
+        return occupied
+
+    def legal_moves(self):
+        """
+        Find which placements are legal for every game's current piece.
+
+        Returns:
+            ndarray: (N, 4, width + WALL_PAD) boolean array indexed by
+                game, rotation and x + WALL_PAD; all False for finished games
+        """
+        n, span = self.num_games, self.width + WALL_PAD
+        games = np.repeat(np.arange(n), 4 * span)
+        dirs = np.tile(np.repeat(np.arange(4), span), n)
+        xs = np.tile(np.arange(span) - WALL_PAD, 4 * n)
+
+        blocked = self._collisions(games, self.current_piece[games], dirs, xs, depth=1)[:, 0]
+        legal = ~blocked.reshape(n, 4, span)
+        legal[self.game_over] = False
+        return legal
+
+    def step(self, rotations, xs):
+        """
+        Hard drop and lock the current piece of every unfinished game.
+        Finished games are left untouched until they are reset.
+
+        Args:
+            rotations (array): Rotation direction (0-3) per game
+            xs (array): X position to drop from per game
+
+        Returns:
+            tuple: (lines_cleared, score_delta, game_over) arrays of length N
+
+        Raises:
+            ValueError: If a placement does not fit at the spawn row
+        """
+        rotations = np.asarray(rotations, dtype=np.int64)
+        xs = np.asarray(xs, dtype=np.int64)
+        lines_cleared = np.zeros(self.num_games, dtype=np.int64)
+        score_delta = np.zeros(self.num_games, dtype=np.int64)
+
+        games = np.flatnonzero(~self.game_over)
+        if not len(games):
+            return lines_cleared, score_delta, self.game_over.copy()
+        pieces, dirs, piece_xs = self.current_piece[games], rotations[games], xs[games]
+
+        occupied = self._collisions(games, pieces, dirs, piece_xs)
+        if occupied[:, 0].any():
+            raise ValueError(f"{int(occupied[:, 0].sum())} placements are blocked")
+        # The floor rows guarantee a collision somewhere below
+        landing = np.argmax(occupied[:, 1:], axis=1)
+
+        # Lock the pieces
+        masks = PIECE_ROW_MASKS[pieces, dirs] << (piece_xs + WALL_PAD)[:, None]
+        for row in range(4):
+            self.boards[games, landing + row] |= masks[:, row]
+
+        # Clear full rows, keeping the order of the remaining ones
+        field = self.boards[games, :self.height]
+        full = field == self.full_row
+        cleared = full.sum(axis=1)
+        order = np.argsort(~full, axis=1, kind='stable')
+        field = np.take_along_axis(field, order, axis=1)
+        field[np.arange(self.height) < cleared[:, None]] = self.empty_row
+        self.boards[games, :self.height] = field
+
+        # Score like Game.add_score and Game.add_rows
+        points = 10 + np.where(cleared > 0, 100 * 2 ** np.maximum(cleared - 1, 0), 0)
+        self.score[games] += points
+        self.rows[games] += cleared
+        self.pieces_placed[games] += 1
+        lines_cleared[games] = cleared
+        score_delta[games] = points
+
+        # Spawn the next pieces and check whether they fit
+        self.current_piece[games] = self.next_piece[games]
+        self.current_x[games] = self.next_x[games]
+        self.next_piece[games], self.next_x[games] = self._random_pieces(games)
+        spawn = self._collisions(games, self.current_piece[games],
+                                 np.full(len(games), UP), self.current_x[games], depth=1)
+        self.game_over[games] = spawn[:, 0]
+
+        return lines_cleared, score_delta, self.game_over.copy()
@@ -0,0 +1,114 @@
+"""
+Beam search agent for Python Tetris.
+This module looks several pieces ahead while keeping only the best boards
+of every ply, so the cost per placement stays bounded. Plies past the
+preview take the best child over all piece types, so the search plans for
+the most favourable piece rather than the expected one; expectimax_agent
+averages over them instead.
+"""
+
+from tetromino import ALL_PIECES, UP
+from heuristic_agent import evaluate_stats, get_placements, make_move
+
+# Score gained per line a piece completes. Without line clears a hard-dropped
+# piece cannot fill holes, and the height it adds outweighs any drop in
+# bumpiness, so completing lines is the only way it can raise the score.
+LINE_GAIN = 0.76
+
+def select_best_move_beam(game, piece, next_piece, depth=3, beam_width=8, cutoff=False):
+    """
+    Select the best move with a beam search over evaluate_board scores.
+    Every ply expands the boards in the beam and keeps the beam_width best
+    children. The current and next pieces are placed first; further plies
+    try every piece and keep the best children of any type. Like
+    select_best_move, lines are not cleared during the lookahead.
+
+    With cutoff enabled, boards of the last ply are expanded best first and
+    a board is skipped when the lines one more piece can complete cannot
+    lift its score above the best leaf found so far. Only boards that
+    cannot produce a better leaf are skipped, so the result is the same.
+    The boards of a beam score too closely for this to skip much, about 1%
+    of the evaluations at depth 3, so it is off by default.
+
+    Args:
+        game (Game): The game object
+        piece (dict): The current piece
+        next_piece (dict): The next piece
+        depth (int): Number of plies to search
+        beam_width (int): Number of boards kept per ply
+        cutoff (bool): Skip last-ply boards that cannot beat the best leaf
+
+    Returns:
+        dict: The best move, with the 'score' of its best leaf
+    """
+    board = game.clone()
+    known = [piece, next_piece]
+    chance = [{'type': piece_type, 'x': (game.width - piece_type.size) // 2, 'y': 0, 'dir': UP}
+              for piece_type in ALL_PIECES]
+
+    best_score, best_root = float('-inf'), None
+    beam = [(evaluate_stats(board.stats), None, board)]  # (score, root placement, board)
+    for ply in range(depth):
+        last = ply == depth - 1
+        ply_pieces = [known[ply]] if ply < len(known) else chance
+        candidates = []
+        for index, (score, root, node) in enumerate(beam):
+            if cutoff and last and score + _max_gain(node) <= best_score:
+                continue
+
+            token = node.snapshot()
+            for ply_piece in ply_pieces:
+                piece_type = ply_piece['type']
+                for dir, x, y in get_placements(node, ply_piece):
+                    node.place(piece_type, x, y, dir, clear_lines=False)
+                    child_score = evaluate_stats(node.stats)
+                    node.restore(token)
+
+                    if not last:
+                        candidates.append((child_score, index, piece_type, dir, x, y))
+                    elif child_score > best_score:
+                        best_score, best_root = child_score, root or (dir, x, y)
+            node.release(token)
+
+        if not candidates:
+            break
+
+        # Keep the best children, ties go to the earliest generated one
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        next_beam = []
+        for child_score, index, piece_type, dir, x, y in candidates[:beam_width]:
+            score, root, node = beam[index]
+            child = node.clone()
+            child.place(piece_type, x, y, dir, clear_lines=False)
+            next_beam.append((child_score, root or (dir, x, y), child))
+        beam = next_beam
+
+    # Without a full-depth leaf, fall back to the best board of the last ply
+    if best_root is None and beam[0][1] is not None:
+        best_score, best_root = beam[0][0], beam[0][1]
+    if best_root is None:
+        return None  # No valid moves
+
+    move = make_move(piece, *best_root)
+    move['score'] = best_score
+    return move
+
+def _max_gain(board):
+    """
+    Bound how much placing one more piece can raise the score of a board.
+    Its 4 cells complete at most the rows whose missing cells add up to 4.
+
+    Args:
+        board (Game): The search board
+
+    Returns:
+        float: Upper bound on the score gain
+    """
+    width = board.width
+    cells, lines = 4, 0
+    for missing in sorted(width - count for count in board.row_counts if 0 < width - count <= 4):
+        if missing > cells:
+            break
+        cells -= missing
+        lines += 1
+    return LINE_GAIN * lines
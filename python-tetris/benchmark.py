@@ -0,0 +1,304 @@
+"""
+Microbenchmarks for the hot paths of Python Tetris.
+This module times the inner loops on a fixed corpus of seeded boards,
+writes the results as JSON and flags regressions against a stored baseline.
+
+Usage:
+    python benchmark.py [--output FILE] [--baseline FILE] [--threshold 0.3] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from tetromino import ALL_PIECES
+from game import Game
+from heuristic_agent import evaluate_board, get_possible_moves, select_best_move, select_best_move_inplace
+
+# The corpus: the boards reached by the AI after these numbers of pieces, in these seeded games
+CORPUS_SEEDS = range(8)
+CORPUS_PIECES = (0, 15, 40, 80)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.3  # Slowdown over the baseline that counts as a regression
+DEFAULT_REPEATS = 5  # Minimum timed runs per benchmark
+MIN_TIME = 1.0  # Cheap benchmarks keep running until they have taken this many seconds
+
+def build_corpus(seeds=CORPUS_SEEDS, pieces=CORPUS_PIECES):
+    """
+    Build the fixed corpus of boards.
+    Each seeded game is played by select_best_move_inplace, and a copy of
+    the game is kept after each number of pieces in pieces.
+
+    Args:
+        seeds (iterable): Seeds of the games to play
+        pieces (tuple): Numbers of pieces after which to keep the board
+
+    Returns:
+        list: Headless games, one per kept board
+    """
+    corpus = []
+    for seed in seeds:
+        game = Game(headless=True, seed=seed)
+        placed = 0
+        for count in pieces:
+            while placed < count and not game.game_over:
+                move = select_best_move_inplace(game, game.current_piece, game.next_piece)
+                game.step(move['piece']['dir'], move['x'], move['y'])
+                placed += 1
+            if not game.game_over:
+                corpus.append(game.clone())
+    return corpus
+
+def line_clear_corpus(corpus):
+    """
+    Find the placements of any piece that complete lines on the corpus boards.
+
+    Args:
+        corpus (list): Games returned by build_corpus
+
+    Returns:
+        list: (game, piece, x, y, dir) for each placement completing a line
+    """
+    placements = []
+    for game in corpus:
+        for piece_type in ALL_PIECES:
+            piece = {'type': piece_type, 'x': 0, 'y': 0, 'dir': 0}
+            for move in get_possible_moves(game, piece):
+                board = game.clone()
+                board.place(piece_type, move['x'], move['y'], move['piece']['dir'], clear_lines=False)
+                if board.stats.complete_lines:
+                    placements.append((game, piece_type, move['x'], move['y'], move['piece']['dir']))
+    return placements
+
+def bench_each_block(corpus):
+    """Every rotation of every piece at every x position of the board."""
+    calls = [(piece, x, dir) for piece in ALL_PIECES for dir in range(4)
+             for x in piece.x_range(dir, corpus[0].width)]
+
+    def run(state):
+        for piece, x, dir in calls:
+            piece.each_block(x, 0, dir)
+    return None, run, len(calls)
+
+def bench_is_occupied(corpus):
+    """Every placement of the current piece on every row of each corpus board."""
+    calls = []
+    for game in corpus:
+        piece = game.current_piece['type']
+        for dir in range(4):
+            for x in piece.x_range(dir, game.width):
+                for y in range(game.height):
+                    calls.append((game.is_occupied, piece, x, y, dir))
+
+    def run(state):
+        for is_occupied, piece, x, y, dir in calls:
+            is_occupied(piece, x, y, dir)
+    return None, run, len(calls)
+
+def bench_remove_lines(corpus):
+    """Line clears after every line-completing placement on the corpus boards."""
+    placements = line_clear_corpus(corpus)
+
+    def setup():
+        boards = []
+        for game, piece, x, y, dir in placements:
+            board = game.clone()
+            board.place(piece, x, y, dir, clear_lines=False)
+            boards.append(board)
+        return boards
+
+    def run(boards):
+        for board in boards:
+            board._remove_lines()
+    return setup, run, len(placements)
+
+def bench_evaluate_board(corpus):
+    """evaluate_board on every corpus board."""
+    boards = [(game.board, game.width, game.height) for game in corpus]
+
+    def run(state):
+        for board, width, height in boards:
+            evaluate_board(board, width, height)
+    return None, run, len(boards)
+
+def bench_get_possible_moves(corpus):
+    """get_possible_moves for the current piece on every corpus board."""
+    def run(state):
+        for game in corpus:
+            get_possible_moves(game, game.current_piece)
+    return None, run, len(corpus)
+
+def bench_select_best_move(corpus):
+    """select_best_move for the current and next piece on every fourth corpus board."""
+    games = corpus[::4]
+
+    def run(state):
+        for game in games:
+            select_best_move(game, game.current_piece, game.next_piece)
+    return None, run, len(games)
+
+BENCHMARKS = {
+    'tetromino.each_block': bench_each_block,
+    'game.is_occupied': bench_is_occupied,
+    'game._remove_lines': bench_remove_lines,
+    'heuristic_agent.evaluate_board': bench_evaluate_board,
+    'heuristic_agent.get_possible_moves': bench_get_possible_moves,
+    'heuristic_agent.select_best_move': bench_select_best_move,
+}
+
+# A fixed pure-Python workload timed alongside every benchmark run
+_CALIBRATION_CELLS = [[x * y & 1 for y in range(20)] for x in range(10)]
+
+def calibrate():
+    """
+    Run the calibration workload: a fixed loop over a board-sized list.
+    Benchmarks are compared relative to it, so results stay comparable
+    across machines and when the speed of the machine drifts during a run.
+    """
+    total = 0
+    for _ in range(50):
+        for column in _CALIBRATION_CELLS:
+            for cell in column:
+                if cell:
+                    total += 1
+    return total
+
+def time_fastest(setup, run, repeats=DEFAULT_REPEATS, min_time=MIN_TIME):
+    """
+    Time a benchmark run repeatedly and keep the fastest run, which is
+    the least disturbed by other activity on the machine. The calibration
+    workload is timed before every run in the same way, so both are
+    measured under the same conditions.
+
+    Args:
+        setup (function, optional): Builds the state passed to run, untimed
+        run (function): The timed work, called with the state
+        repeats (int): Minimum number of timed runs
+        min_time (float): Keep running until the runs have taken this many seconds
+
+    Returns:
+        tuple: (seconds, calibration seconds) of the fastest runs
+    """
+    best = best_calibration = float('inf')
+    total = 0.0
+    runs = 0
+    while runs < repeats or total < min_time:
+        state = setup() if setup else None
+        start = time.perf_counter()
+        calibrate()
+        middle = time.perf_counter()
+        run(state)
+        end = time.perf_counter()
+        best_calibration = min(best_calibration, middle - start)
+        best = min(best, end - middle)
+        total += end - middle
+        runs += 1
+    return best, best_calibration
+
+def run_benchmarks(repeats=DEFAULT_REPEATS, names=None):
+    """
+    Run the benchmarks on the corpus, keeping the fastest run of each.
+
+    Args:
+        repeats (int): Minimum number of timed runs per benchmark
+        names (list, optional): Benchmarks to run. Defaults to all of BENCHMARKS.
+
+    Returns:
+        dict: Results with the environment and, per benchmark, the seconds
+            of the fastest run, the operations per run, microseconds per
+            operation and the seconds of the fastest calibration run
+    """
+    corpus = build_corpus()
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, run, ops = BENCHMARKS[name](corpus)
+        best, calibration = time_fastest(setup, run, repeats)
+        results[name] = {
+            'seconds': best,
+            'ops': ops,
+            'us_per_op': best / ops * 1e6,
+            'calibration_seconds': calibration
+        }
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus_boards': len(corpus),
+        'benchmarks': results
+    }
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results to a baseline, each relative to its calibration workload.
+
+    Args:
+        results (dict): Results returned by run_benchmarks
+        baseline (dict): Results of an earlier run
+        threshold (float): Relative slowdown that counts as a regression
+
+    Returns:
+        list: (name, ratio) for each benchmark slower than the baseline by more than threshold
+    """
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        reference = baseline['benchmarks'].get(name)
+        if reference is None:
+            continue
+        ratio = ((result['us_per_op'] / result['calibration_seconds'])
+                 / (reference['us_per_op'] / reference['calibration_seconds']))
+        result['baseline_ratio'] = ratio
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+def main(argv=None):
+    """
+    Run the benchmarks from the command line.
+
+    Args:
+        argv (list, optional): Command line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: Exit status, 1 if a benchmark regressed
+    """
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the Python Tetris hot paths")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file to compare to")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown that counts as a regression")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="Minimum timed runs per benchmark")
+    parser.add_argument('--update-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('names', nargs='*', help="Benchmarks to run. Defaults to all of them.")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = run_benchmarks(args.repeats, args.names)
+
+    regressions = []
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    for name, result in results['benchmarks'].items():
+        ratio = result.get('baseline_ratio')
+        versus = f"  {ratio:5.2f}x baseline" if ratio is not None else ""
+        print(f"{name:36} {result['us_per_op']:12.2f} us/op{versus}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    for name, ratio in regressions:
+        print(f"REGRESSION: {name} is {ratio:.2f}x slower than the baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
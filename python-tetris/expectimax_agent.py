@@ -0,0 +1,127 @@
+"""
+Expectimax search agent for Python Tetris.
+This module searches past the preview piece by averaging over the pieces
+that could come next, deepening until a time budget runs out.
+"""
+
+import time
+from tetromino import ALL_PIECES, UP
+from heuristic_agent import evaluate_stats, get_placements, make_move
+
+# Lines cleared before the last ply are credited like complete lines in evaluate_board
+LINE_CLEAR_WEIGHT = 0.76
+# Value of a board on which a piece has nowhere to go
+GAME_OVER_SCORE = -1000.0
+
+class _SearchTimeout(Exception):
+    """Raised inside the search when the time budget is used up."""
+
+def select_best_move_expectimax(game, piece, next_piece, depth=3, time_budget=None,
+                                placements=get_placements):
+    """
+    Select the best move with an expectimax search of the given depth.
+    The current and next pieces are searched as max nodes; deeper plies
+    average over the 7 pieces. The search deepens one ply at a time and,
+    when the time budget runs out, returns the best move of the deepest
+    search that finished. Depth 1 always finishes.
+
+    Args:
+        game (Game): The game object
+        piece (dict): The current piece
+        next_piece (dict): The next piece
+        depth (int): Maximum number of plies to search
+        time_budget (float, optional): Seconds available for the decision
+        placements (function): Placement generator, get_placements or
+            get_reachable_placements
+
+    Returns:
+        dict: The best move, with the 'score' and 'depth' it was chosen at
+    """
+    board = game.clone()
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    known = [piece, next_piece]
+    chance = [{'type': piece_type, 'x': (game.width - piece_type.size) // 2, 'y': 0, 'dir': UP}
+              for piece_type in ALL_PIECES]
+
+    best = None
+    for current_depth in range(1, depth + 1):
+        try:
+            result = _max_value(board, known, chance, current_depth,
+                                deadline if current_depth > 1 else None, placements, root=True)
+        except _SearchTimeout:
+            break
+        if result is None:
+            return None  # No valid moves
+        best = (result, current_depth)
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+    (score, dir, x, y), reached_depth = best
+    move = make_move(piece, dir, x, y)
+    move['score'] = score
+    move['depth'] = reached_depth
+    return move
+
+def _max_value(board, known, chance, depth, deadline, placements, root=False):
+    """
+    Value of placing the first known piece as well as possible.
+
+    Args:
+        board (Game): The search board
+        known (list): Pieces known for the coming plies, the first is placed now
+        chance (list): One piece per type, used once the known pieces run out
+        depth (int): Plies left to search, including this one
+        deadline (float, optional): time.monotonic() value to stop at
+        placements (function): Placement generator
+        root (bool): Return the best placement along with its value
+
+    Returns:
+        float: The best value, or (value, dir, x, y) at the root
+    """
+    if deadline is not None and time.monotonic() > deadline:
+        raise _SearchTimeout()
+
+    piece = known[0]
+    piece_type = piece['type']
+    best = None
+    token = board.snapshot()
+    for dir, x, y in placements(board, piece):
+        if depth == 1:
+            board.place(piece_type, x, y, dir, clear_lines=False)
+            value = evaluate_stats(board.stats)
+        else:
+            lines = board.place(piece_type, x, y, dir)
+            value = LINE_CLEAR_WEIGHT * lines + _expected_value(
+                board, known[1:], chance, depth - 1, deadline, placements)
+        board.restore(token)
+
+        if best is None or value > best[0]:
+            best = (value, dir, x, y)
+    board.release(token)
+
+    if root:
+        return best
+    return GAME_OVER_SCORE if best is None else best[0]
+
+def _expected_value(board, known, chance, depth, deadline, placements):
+    """
+    Value of the next ply, averaged over every piece when it is not known.
+
+    Args:
+        board (Game): The search board
+        known (list): Pieces known for the coming plies, may be empty
+        chance (list): One piece per type
+        depth (int): Plies left to search
+        deadline (float, optional): time.monotonic() value to stop at
+        placements (function): Placement generator
+
+    Returns:
+        float: The expected value
+    """
+    if known:
+        return _max_value(board, known, chance, depth, deadline, placements)
+
+    total = 0.0
+    for piece in chance:
+        total += _max_value(board, [piece], chance, depth, deadline, placements)
+    return total / len(chance)
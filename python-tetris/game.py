@@ -3,30 +3,187 @@ Core game logic for Python Tetris.
 This module handles the game board, piece movement, collision detection, and scoring.
 """
 
+import copy
 import random
 import time
+from functools import lru_cache
 from tetromino import ALL_PIECES, UP, RIGHT, DOWN, LEFT, MIN_DIR, MAX_DIR
+from piece_sequence import BagSequence
+
+# Number of wall bits kept on each side of a bitboard row.
+# A piece is at most 4 blocks wide, so 3 wall bits catch any overhang
+# of a piece whose leftmost column is still on the board.
+WALL_PAD = 3
+# Number of full rows kept below the bottom of a bitboard as the floor.
+# A piece is at most 4 blocks tall, so no row of a piece resting on the
+# board or just below it reaches past them.
+FLOOR_ROWS = 4
+
+@lru_cache(maxsize=None)
+def piece_masks(width):
+    """
+    Get the row masks of every piece shifted to every position on a board.
+    
+    Args:
+        width (int): Width of the board
+        
+    Returns:
+        dict: masks[piece][dir][x + WALL_PAD] is a tuple of (row, mask) pairs
+            for the non-empty rows of the piece at x, lined up with bitboard rows
+    """
+    return {piece: tuple(tuple(tuple((row, mask << shift) for row, mask in piece.row_masks[dir])
+                               for shift in range(width + WALL_PAD))
+                         for dir in range(4))
+            for piece in ALL_PIECES}
+
+@lru_cache(maxsize=None)
+def zobrist_keys(width, height):
+    """
+    Get the Zobrist keys for a board size.
+    The keys come from a fixed seed, so hashes agree across processes.
+    
+    Args:
+        width (int): Width of the board
+        height (int): Height of the board
+        
+    Returns:
+        tuple: keys[y][x] is the random 64-bit key of cell (x, y)
+    """
+    rng = random.Random(0x7E7215)
+    return tuple(tuple(rng.getrandbits(64) for x in range(width)) for y in range(height))
+
+def board_hash(board, width, height):
+    """
+    Compute the Zobrist hash of a column-major board from scratch.
+    Matches Game.board_hash for the same occupied cells.
+    
+    Args:
+        board (list): 2D list representing the game board
+        width (int): Width of the board
+        height (int): Height of the board
+        
+    Returns:
+        int: 64-bit hash of the occupied cells
+    """
+    keys = zobrist_keys(width, height)
+    result = 0
+    for x in range(width):
+        column = board[x]
+        for y in range(height):
+            if column[y]:
+                result ^= keys[y][x]
+    return result
+
+class BoardStats:
+    """
+    Read-only view of the board statistics a Game maintains incrementally.
+    Every aggregate is computed from per-column or per-row counters,
+    so reading it never scans the board cells.
+    """
+    
+    __slots__ = ('_game',)
+    
+    def __init__(self, game):
+        """
+        Initialize the view.
+        
+        Args:
+            game (Game): The game whose counters are exposed
+        """
+        self._game = game
+    
+    @property
+    def column_heights(self):
+        """tuple: Height of the highest block in each column."""
+        return tuple(self._game.column_heights)
+    
+    @property
+    def column_holes(self):
+        """tuple: Number of empty cells below the highest block of each column."""
+        return tuple(h - f for h, f in zip(self._game.column_heights, self._game.column_fills))
+    
+    @property
+    def row_counts(self):
+        """tuple: Number of occupied cells in each row."""
+        return tuple(self._game.row_counts)
+    
+    @property
+    def aggregate_height(self):
+        """int: Sum of all column heights."""
+        return sum(self._game.column_heights)
+    
+    @property
+    def max_height(self):
+        """int: Height of the highest column."""
+        return max(self._game.column_heights)
+    
+    @property
+    def holes(self):
+        """int: Total number of holes on the board."""
+        return sum(self._game.column_heights) - sum(self._game.column_fills)
+    
+    @property
+    def complete_lines(self):
+        """int: Number of rows that are completely filled."""
+        return self._game.row_counts.count(self._game.width)
+    
+    @property
+    def bumpiness(self):
+        """int: Sum of height differences between adjacent columns."""
+        heights = self._game.column_heights
+        return sum(abs(a - b) for a, b in zip(heights, heights[1:]))
 
 class Game:
     """
     Main game class that handles the Tetris game logic.
     """
     
-    def __init__(self, width=10, height=20):
+    def __init__(self, width=10, height=20, headless=False, seed=None, sequence=None):
         """
         Initialize a new Tetris game.
         
         Args:
             width (int): Width of the game board in blocks
             height (int): Height of the game board in blocks
+            headless (bool): Run without a wall clock, driven only by step()
+            seed (int, optional): Seed for the game's own random generator
+            sequence (object, optional): Piece sequence generator, such as a
+                PieceStream. The game plays its own copy, so one sequence can be
+                given to several games. Defaults to a BagSequence drawing from
+                the game's generator.
         """
         self.width = width
         self.height = height
+        self.headless = headless
+        self.rng = random.Random(seed)
+        self.sequence = copy.copy(sequence) if sequence is not None else BagSequence()
+        self.recorder = None  # Receives every locked piece, see replay.ReplayRecorder
+        # Row bitmasks: bit (x + WALL_PAD) is column x, the bits outside the
+        # playfield are permanently set so they act as side walls, and
+        # FLOOR_ROWS full rows below the board act as the floor
+        self.full_row = (1 << (width + 2 * WALL_PAD)) - 1
+        self.empty_row = self.full_row ^ (((1 << width) - 1) << WALL_PAD)
+        self.piece_masks = piece_masks(width)
+        self.zobrist_keys = zobrist_keys(width, height)
         self.reset()
         
-    def reset(self):
-        """Reset the game to its initial state."""
+    def reset(self, seed=None):
+        """
+        Reset the game to its initial state.
+        
+        Args:
+            seed (int, optional): Reseed the game's random generator first
+        """
         self.board = self._initialize_board(self.width, self.height)
+        self.bitboard = [self.empty_row] * self.height + [self.full_row] * FLOOR_ROWS
+        self.row_counts = [0] * self.height  # Occupied cells per row
+        self.column_heights = [0] * self.width
+        self.column_fills = [0] * self.width  # Occupied cells per column
+        self.board_hash = 0  # Zobrist hash of the occupied cells
+        self.stats = BoardStats(self)
+        self._journal = None  # Undo records, kept only while a snapshot is live
+        self._snapshots = 0
+        self._draw_journaled = False  # Generator state journaled since the last snapshot
         self.score = 0
         self.visual_score = 0
         self.rows = 0
@@ -36,12 +193,14 @@ class Game:
         self.speed = 0.6  # Initial speed (seconds per drop)
         self.speed_decrement = 0.005  # How much to decrease speed per level
         self.min_speed = 0.1  # Minimum speed
-        self.last_time = time.time()
+        self.last_time = 0 if self.headless else time.time()
         self.dt = 0  # Delta time
         
         # Initialize pieces
-        self.pieces = list(ALL_PIECES) * 4  # 4 of each piece
-        random.shuffle(self.pieces)
+        if seed is not None:
+            self.rng.seed(seed)
+        self.sequence.reset(self.rng, self.width)
+        self.pieces_drawn = 0
         
         # Set up current and next piece
         self.next_piece = self._random_piece()
@@ -62,18 +221,18 @@ class Game:
     
     def _random_piece(self):
         """
-        Get a random piece from the bag.
-        If the bag is empty, refill it with 4 of each piece.
+        Get the next piece from the piece sequence.
         
         Returns:
             dict: A dictionary with piece type, position, and rotation
         """
-        if not self.pieces:
-            self.pieces = list(ALL_PIECES) * 4
-            random.shuffle(self.pieces)
-            
-        piece_type = self.pieces.pop()
-        x = random.randint(0, self.width - piece_type.size)
+        if self._journal is not None and not self._draw_journaled:
+            # Save the generator only when a snapshot is followed by a draw
+            self._journal.append(('draw', self.pieces_drawn, self.rng.getstate(),
+                                  self.sequence.get_state()))
+            self._draw_journaled = True
+        piece_type, x = self.sequence.next_piece()
+        self.pieces_drawn += 1
         
         return {
             'type': piece_type,
@@ -85,6 +244,9 @@ class Game:
     def is_occupied(self, piece, x, y, dir):
         """
         Check if a piece can fit at the given position.
+        Tests each piece row mask, already shifted to x, against the bitboard
+        row it overlaps. The walls and floor rows of the bitboard stop the
+        piece, so rows are only bounds checked when far outside the board.
         
         Args:
             piece (Tetromino): The piece to check
@@ -95,11 +257,17 @@ class Game:
         Returns:
             bool: True if the position is occupied, False otherwise
         """
-        for block_x, block_y in piece.each_block(x, y, dir):
-            if (block_x < 0 or block_x >= self.width or 
-                block_y < 0 or block_y >= self.height or 
-                self.board[block_x][block_y]):
-                return True
+        shift = x + WALL_PAD
+        if shift < 0 or y < -FLOOR_ROWS:
+            return True
+        bitboard = self.bitboard
+        try:
+            # Rows just above the board wrap around to the floor rows
+            for row, mask in self.piece_masks[piece][dir][shift]:
+                if bitboard[y + row] & mask:
+                    return True
+        except IndexError:  # Past the right wall or below the floor rows
+            return True
         return False
     
     def move(self, direction):
@@ -153,69 +321,369 @@ class Game:
             bool: True if game continues, False if game over
         """
         if not self.move(DOWN):
-            self.add_score(10)  # Points for dropping a piece
-            self._drop_piece()
-            self._remove_lines()
-            self.current_piece = self.next_piece
-            self.next_piece = self._random_piece()
-            self.actions = []  # Clear pending actions
-            
-            # Check if the new piece can fit
-            if self.is_occupied(self.current_piece['type'], 
-                               self.current_piece['x'], 
-                               self.current_piece['y'], 
-                               self.current_piece['dir']):
-                self.game_over = True
-                return False
+            self._lock_piece()
+            return not self.game_over
         return True
     
+    def step(self, rotation, x, y=None):
+        """
+        Hard drop the current piece at the given placement and lock it.
+        This is the clock-free entry point for headless simulation:
+        no timing, input queue or rendering is involved.
+        
+        Args:
+            rotation (int): Rotation direction (0-3) to place the piece in
+            x (int): X position to drop the piece from
+            y (int, optional): Lock the piece at this row instead of hard
+                dropping it, e.g. to replay a slide under an overhang
+            
+        Returns:
+            tuple: (lines_cleared, score_delta, game_over)
+            
+        Raises:
+            ValueError: If the piece does not fit at its spawn row, or at y
+        """
+        if self.game_over:
+            return (0, 0, True)
+        
+        piece = self.current_piece
+        piece_type = piece['type']
+        if y is not None:
+            if self.is_occupied(piece_type, x, y, rotation):
+                raise ValueError(f"Placement (rotation={rotation}, x={x}, y={y}) is blocked")
+        else:
+            y = piece['y']
+            if self.is_occupied(piece_type, x, y, rotation):
+                raise ValueError(f"Placement (rotation={rotation}, x={x}) is blocked")
+            while not self.is_occupied(piece_type, x, y + 1, rotation):
+                y += 1
+        
+        piece['x'], piece['y'], piece['dir'] = x, y, rotation
+        score = self.score
+        lines_cleared = self._lock_piece()
+        return (lines_cleared, self.score - score, self.game_over)
+    
+    def _lock_piece(self):
+        """
+        Lock the current piece, clear lines and spawn the next piece.
+        
+        Returns:
+            int: Number of lines cleared
+        """
+        if self.recorder is not None:
+            self.recorder.record(self.current_piece)
+        self.add_score(10)  # Points for dropping a piece
+        rows = self._drop_piece()
+        lines_cleared = self._remove_lines(rows)
+        self.current_piece = self.next_piece
+        self.next_piece = self._random_piece()
+        self.actions = []  # Clear pending actions
+        
+        # Check if the new piece can fit
+        if self.is_occupied(self.current_piece['type'], 
+                           self.current_piece['x'], 
+                           self.current_piece['y'], 
+                           self.current_piece['dir']):
+            self.game_over = True
+        return lines_cleared
+    
     def _drop_piece(self):
-        """Place the current piece on the board."""
-        for x, y in self.current_piece['type'].each_block(
-            self.current_piece['x'], 
-            self.current_piece['y'], 
-            self.current_piece['dir']):
-            self.board[x][y] = self.current_piece['type']
+        """
+        Place the current piece on the board.
+        
+        Returns:
+            list: The rows the piece was placed in
+        """
+        return self._place_piece(self.current_piece['type'], self.current_piece['x'],
+                                 self.current_piece['y'], self.current_piece['dir'])
+    
+    def _place_piece(self, piece, x, y, dir):
+        """
+        Write a piece into the board and update the board counters.
+        
+        Args:
+            piece (Tetromino): The piece to place
+            x (int): X position
+            y (int): Y position
+            dir (int): Rotation direction
+            
+        Returns:
+            list: The rows the piece was placed in
+        """
+        if self._journal is not None:
+            heights = [(x + col, self.column_heights[x + col]) for col, row in piece.top_profile[dir]]
+            self._journal.append(('place', piece, x, y, dir, heights))
+        
+        rows = []
+        for row, mask in self.piece_masks[piece][dir][x + WALL_PAD]:
+            self.bitboard[y + row] |= mask
+            rows.append(y + row)
+        for col, row in piece.cells[dir]:
+            self.board[x + col][y + row] = piece
+            self.row_counts[y + row] += 1
+            self.column_fills[x + col] += 1
+            self.board_hash ^= self.zobrist_keys[y + row][x + col]
+        for col, row in piece.top_profile[dir]:
+            self.column_heights[x + col] = max(self.column_heights[x + col],
+                                               self.height - y - row)
+        return rows
+    
+    def place(self, piece, x, y, dir, clear_lines=True):
+        """
+        Place a piece on the board without spawning a new one.
+        Intended for search: combine with snapshot() and restore() to try
+        a placement, evaluate the board and roll it back.
+        The position is not checked, use is_occupied first.
+        
+        Args:
+            piece (Tetromino): The piece to place
+            x (int): X position
+            y (int): Y position
+            dir (int): Rotation direction
+            clear_lines (bool): Remove completed lines and score them
+            
+        Returns:
+            int: Number of lines cleared
+        """
+        rows = self._place_piece(piece, x, y, dir)
+        return self._remove_lines(rows) if clear_lines else 0
+    
+    def snapshot(self):
+        """
+        Start recording board changes so they can be rolled back.
+        Board changes are journaled per placement and line clear, and the
+        random generator and piece sequence on the first piece drawn
+        afterwards. Only scalar state such as the score and the pieces is
+        copied here.
+        
+        Returns:
+            tuple: Token to pass to restore() and release()
+        """
+        if self._journal is None:
+            self._journal = []
+        self._snapshots += 1
+        self._draw_journaled = False
+        return (len(self._journal), self.score, self.visual_score, self.rows,
+                self.speed, self.game_over, dict(self.current_piece),
+                dict(self.next_piece))
+    
+    def restore(self, token):
+        """
+        Roll the game back to the state it had when the snapshot was taken.
+        The snapshot stays live and can be restored again.
+        
+        Args:
+            token (tuple): Token returned by snapshot()
+        """
+        (position, self.score, self.visual_score, self.rows, self.speed,
+         self.game_over, current_piece, next_piece) = token
+        self.current_piece = dict(current_piece)
+        self.next_piece = dict(next_piece)
+        
+        while len(self._journal) > position:
+            record = self._journal.pop()
+            if record[0] == 'place':
+                self._undo_place(*record[1:])
+            elif record[0] == 'draw':
+                self.pieces_drawn = record[1]
+                self.rng.setstate(record[2])
+                self.sequence.set_state(record[3])
+            else:
+                self._undo_compact(*record[1:])
+        self._draw_journaled = False
+    
+    def release(self, token):
+        """
+        Release a snapshot that will not be restored anymore.
+        Journaling stops once no snapshot is live.
+        
+        Args:
+            token (tuple): Token returned by snapshot()
+        """
+        self._snapshots -= 1
+        if self._snapshots <= 0:
+            self._snapshots = 0
+            self._journal = None
+    
+    def clone(self):
+        """
+        Copy the board, its counters and the pieces into a new headless game.
+        The copy is meant as a scratch board for search, it does not
+        share any mutable state with this game.
+        
+        Returns:
+            Game: The copy
+        """
+        other = Game.__new__(Game)
+        other.__dict__.update(self.__dict__)
+        other.headless = True
+        other.board = [column[:] for column in self.board]
+        other.bitboard = self.bitboard[:]
+        other.row_counts = self.row_counts[:]
+        other.column_heights = self.column_heights[:]
+        other.column_fills = self.column_fills[:]
+        other.stats = BoardStats(other)
+        other.actions = []
+        other.current_piece = dict(self.current_piece)
+        other.next_piece = dict(self.next_piece)
+        other.recorder = None
+        other._journal = None
+        other._snapshots = 0
+        other._draw_journaled = False
+        
+        other.rng = random.Random()
+        other.rng.setstate(self.rng.getstate())
+        other.sequence = copy.copy(self.sequence)
+        other.sequence.reset(other.rng, other.width)
+        other.sequence.set_state(self.sequence.get_state())
+        return other
+    
+    def encode_board(self):
+        """
+        Pack the board cells into bytes, one per cell in row-major order:
+        0 for an empty cell, otherwise 1 + the index of its piece in ALL_PIECES.
+        Much cheaper to send to another process than the game itself.
+        
+        Returns:
+            bytes: The packed cells
+        """
+        index = {piece: i + 1 for i, piece in enumerate(ALL_PIECES)}
+        return bytes(index[self.board[x][y]] if self.board[x][y] else 0
+                     for y in range(self.height) for x in range(self.width))
+    
+    @classmethod
+    def decode_board(cls, data, width=10, height=20):
+        """
+        Build a headless game whose board holds cells packed by encode_board().
+        The board counters and hash are rebuilt; the pieces are freshly drawn.
+        
+        Args:
+            data (bytes): The packed cells
+            width (int): Width of the packed board
+            height (int): Height of the packed board
+        
+        Returns:
+            Game: The new game
+        """
+        game = cls(width, height, headless=True)
+        for y in range(height):
+            for x in range(width):
+                index = data[y * width + x]
+                if index:
+                    game.board[x][y] = ALL_PIECES[index - 1]
+                    game.bitboard[y] |= 1 << (x + WALL_PAD)
+                    game.row_counts[y] += 1
+                    game.column_fills[x] += 1
+                    game.board_hash ^= game.zobrist_keys[y][x]
+                    game.column_heights[x] = max(game.column_heights[x], height - y)
+        return game
+    
+    def _undo_place(self, piece, x, y, dir, heights):
+        """Remove a piece written by _place_piece and restore the counters."""
+        for row, mask in self.piece_masks[piece][dir][x + WALL_PAD]:
+            self.bitboard[y + row] &= ~mask
+        for col, row in piece.cells[dir]:
+            self.board[x + col][y + row] = 0
+            self.row_counts[y + row] -= 1
+            self.column_fills[x + col] -= 1
+            self.board_hash ^= self.zobrist_keys[y + row][x + col]
+        for x, height in heights:
+            self.column_heights[x] = height
     
-    def _remove_lines(self):
+    def _undo_compact(self, bottom, columns, bitboard, row_counts, column_heights, column_fills,
+                      board_hash):
+        """Put back the rows overwritten by _compact_rows and restore the counters."""
+        self.board_hash = board_hash
+        for column, saved in zip(self.board, columns):
+            column[:bottom] = saved
+        self.bitboard[:bottom] = bitboard
+        self.row_counts[:bottom] = row_counts
+        self.column_heights[:] = column_heights
+        self.column_fills[:] = column_fills
+    
+    def _remove_lines(self, rows=None):
         """
         Remove completed lines and add to score.
         The more lines cleared at once, the higher the score.
+        
+        Args:
+            rows (list, optional): Rows that may have been completed.
+                Defaults to every row of the board.
+        
+        Returns:
+            int: Number of lines cleared
         """
-        lines_cleared = 0
-        y = self.height - 1
-        while y >= 0:
-            complete = True
-            for x in range(self.width):
-                if not self.board[x][y]:
-                    complete = False
-                    break
-                    
-            if complete:
-                self._remove_line(y)
-                lines_cleared += 1
-            else:
-                y -= 1
-                
+        if rows is None:
+            rows = range(self.height)
+        full_rows = [y for y in rows if self.row_counts[y] == self.width]
+        lines_cleared = len(full_rows)
+        
         if lines_cleared > 0:
+            self._compact_rows(full_rows)
             self.add_rows(lines_cleared)
             # Score increases exponentially with more lines
             self.add_score(100 * (2 ** (lines_cleared - 1)))
+        return lines_cleared
     
-    def _remove_line(self, n):
+    def _compact_rows(self, full_rows):
         """
-        Remove a completed line and shift all lines above it down.
+        Remove completed lines and shift the lines above them down in one pass.
+        Rows below the lowest completed line do not move.
+        Every column loses one block per completed line, and only columns
+        whose top block was removed need to search down for their new top.
         
         Args:
-            n (int): The line number to remove
+            full_rows (list): The line numbers to remove
+        """
+        full = set(full_rows)
+        bottom = max(full_rows) + 1
+        kept = [y for y in range(bottom) if y not in full]
+        empty = len(full)
+        
+        if self._journal is not None:
+            self._journal.append(('compact', bottom, [column[:bottom] for column in self.board],
+                                  self.bitboard[:bottom], self.row_counts[:bottom],
+                                  list(self.column_heights), list(self.column_fills),
+                                  self.board_hash))
+        
+        # Rows below the lowest completed line keep their hash keys
+        for y in range(bottom):
+            self.board_hash ^= self._row_hash(y, self.bitboard[y])
+        
+        for column in self.board:
+            column[:bottom] = [0] * empty + [column[y] for y in kept]
+        self.bitboard[:bottom] = [self.empty_row] * empty + [self.bitboard[y] for y in kept]
+        self.row_counts[:bottom] = [0] * empty + [self.row_counts[y] for y in kept]
+        for y in range(empty, bottom):
+            self.board_hash ^= self._row_hash(y, self.bitboard[y])
+        
+        for x, column in enumerate(self.board):
+            self.column_fills[x] -= empty
+            height = self.column_heights[x] - empty
+            while height > 0 and not column[self.height - height]:
+                height -= 1
+            self.column_heights[x] = height
+    
+    def _row_hash(self, y, bits):
+        """
+        Combine the Zobrist keys of the occupied cells of a row.
+        
+        Args:
+            y (int): The row number
+            bits (int): The bitboard row
+            
+        Returns:
+            int: XOR of the keys of the occupied cells
         """
-        for y in range(n, 0, -1):
-            for x in range(self.width):
-                self.board[x][y] = self.board[x][y-1]
-                
-        # Clear the top line
+        if bits == self.empty_row:
+            return 0
+        keys = self.zobrist_keys[y]
+        result = 0
+        bits >>= WALL_PAD
         for x in range(self.width):
-            self.board[x][0] = 0
+            if bits >> x & 1:
+                result ^= keys[x]
+        return result
     
     def add_score(self, points):
         """
@@ -4,7 +4,27 @@ This module provides functions for evaluating board states and selecting optimal
 """
 
 import copy
+from functools import partial
+from collections import OrderedDict, deque
 from tetromino import UP, RIGHT, DOWN, LEFT
+from game import WALL_PAD
+
+# Maximum number of boards get_reachable_placements remembers
+REACHABILITY_CACHE_SIZE = 4096
+_reachability_cache = {}
+# Default number of placement lists kept by an EvaluationCache, about 1.5 KB each
+EVALUATION_CACHE_SIZE = 1024
+
+# Features computed by extract_features, in vector order
+FEATURE_NAMES = ('aggregate_height', 'complete_lines', 'holes', 'bumpiness',
+                 'row_transitions', 'column_transitions', 'cumulative_wells',
+                 'landing_height', 'eroded_cells', 'max_height')
+# Weights of evaluate_board
+DEFAULT_WEIGHTS = (-0.51, 0.76, -0.36, -0.18, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+# Pierre Dellacherie's weights as tuned for El-Tetris
+EL_TETRIS_WEIGHTS = (0.0, 0.0, -7.899265427351652, 0.0, -3.2178882868487753,
+                     -9.348695305445199, -3.3855972247263626, -4.500158825082766,
+                     3.4181268101392694, 0.0)
 
 def evaluate_board(board, width, height):
     """
@@ -59,6 +79,120 @@ def evaluate_board(board, width, height):
     # Using the same weights as the JavaScript version
     return -0.51 * aggregate_height + 0.76 * complete_lines - 0.36 * holes - 0.18 * bumpiness
 
+def evaluate_stats(stats):
+    """
+    Evaluate a board from its maintained statistics.
+    Gives the same score as evaluate_board in O(width) time.
+    
+    Args:
+        stats (BoardStats): Statistics of the board, e.g. game.stats
+        
+    Returns:
+        float: Heuristic score for the board state
+    """
+    return (-0.51 * stats.aggregate_height + 0.76 * stats.complete_lines
+            - 0.36 * stats.holes - 0.18 * stats.bumpiness)
+
+def extract_features(board, width, height, placement=None):
+    """
+    Compute the extended feature vector of a board in a single pass.
+    The first four features are those of evaluate_board. Walls and the
+    floor count as filled cells for transitions and wells. Landing height
+    and eroded cells describe the last placed piece and are 0 without one;
+    eroded cells are only seen while its completed lines are still on the
+    board, as in the search, which does not clear lines.
+    
+    Args:
+        board (list): 2D list representing the game board
+        width (int): Width of the board
+        height (int): Height of the board
+        placement (tuple, optional): (piece, x, y, dir) of the last placed piece
+        
+    Returns:
+        tuple: One value per name in FEATURE_NAMES
+    """
+    column_heights = [0] * width
+    row_fills = [0] * height
+    holes = 0
+    row_transitions = 0
+    column_transitions = 0
+    cumulative_wells = 0
+    
+    for x in range(width):
+        column = board[x]
+        left = board[x - 1] if x > 0 else None
+        right = board[x + 1] if x < width - 1 else None
+        filled = bool(column[0])  # The top of the board is not a transition
+        well_depth = 0
+        
+        for y in range(height):
+            left_filled = left is None or bool(left[y])
+            if column[y]:
+                if not column_heights[x]:
+                    column_heights[x] = height - y
+                row_fills[y] += 1
+                if not filled:
+                    column_transitions += 1
+                filled = True
+                well_depth = 0
+                if not left_filled:
+                    row_transitions += 1
+            else:
+                if column_heights[x]:
+                    holes += 1
+                if filled:
+                    column_transitions += 1
+                filled = False
+                if left_filled:
+                    row_transitions += 1
+                if right is None:
+                    row_transitions += 1  # The right wall
+                
+                # Empty cells between two filled cells are well cells,
+                # a well n cells deep adds 1 + 2 + ... + n
+                if left_filled and (right is None or right[y]):
+                    well_depth += 1
+                    cumulative_wells += well_depth
+                else:
+                    well_depth = 0
+        
+        if not filled:
+            column_transitions += 1  # The floor
+    
+    landing_height = 0
+    eroded_cells = 0
+    if placement is not None:
+        piece, x, y, dir = placement
+        min_col, min_row, max_col, max_row = piece.bounds[dir]
+        landing_height = height - y - (min_row + max_row) / 2
+        rows = [y + row for col, row in piece.cells[dir] if row_fills[y + row] == width]
+        eroded_cells = len(set(rows)) * len(rows)
+    
+    bumpiness = 0
+    for x in range(width - 1):
+        bumpiness += abs(column_heights[x] - column_heights[x + 1])
+    
+    return (sum(column_heights), row_fills.count(width), holes, bumpiness,
+            row_transitions, column_transitions, cumulative_wells,
+            landing_height, eroded_cells, max(column_heights))
+
+def score_features(features, weights=DEFAULT_WEIGHTS):
+    """
+    Combine a feature vector into a score.
+    With DEFAULT_WEIGHTS the score equals evaluate_board exactly.
+    
+    Args:
+        features (tuple): Vector returned by extract_features
+        weights (tuple): One weight per name in FEATURE_NAMES
+        
+    Returns:
+        float: Heuristic score for the board state
+    """
+    score = 0.0
+    for weight, feature in zip(weights, features):
+        score += weight * feature
+    return score
+
 def copy_board(board, width, height):
     """
     Create a deep copy of the game board.
@@ -73,6 +207,63 @@ def copy_board(board, width, height):
     """
     return copy.deepcopy(board)
 
+def get_column_heights(board, width, height):
+    """
+    Compute the skyline of a column-major board.
+    
+    Args:
+        board (list): 2D list representing the game board
+        width (int): Width of the board
+        height (int): Height of the board
+        
+    Returns:
+        list: Height of the highest block in each column
+    """
+    column_heights = [0] * width
+    for x in range(width):
+        column = board[x]
+        for y in range(height):
+            if column[y]:
+                column_heights[x] = height - y
+                break
+    return column_heights
+
+def get_landing_position(board, piece_type, x, dir, column_heights, height):
+    """
+    Determine where a piece dropped from the top row lands.
+    The piece rests on the highest block below each of its columns, so the
+    landing row follows from the skyline and the bottom profile of the
+    rotation in O(piece width). Only when the stack reaches the rows the
+    piece starts in, where it may slide under an overhang, are the board
+    cells scanned instead.
+    
+    Args:
+        board (list): 2D list representing the board being searched
+        piece_type (Tetromino): The piece to drop
+        x (int): X position to drop from, between the walls
+        dir (int): Rotation direction
+        column_heights (list): Skyline of the board, e.g. game.column_heights
+        height (int): Height of the board
+        
+    Returns:
+        int: Y position where the piece lands, or None if it does not fit at the top row
+    """
+    y = min(height - column_heights[x + col] - 1 - row for col, row in piece_type.bottom_profile[dir])
+    if y >= 0:
+        return y
+    
+    cells = piece_type.cells[dir]
+    
+    def blocked(y):
+        return any(y + row >= height or board[x + col][y + row] for col, row in cells)
+    
+    if blocked(0):
+        return None
+    y = 0
+    while not blocked(y + 1):
+        y += 1
+    return y
+
 def get_drop_position(game, piece, x):
     """
     Determine where a piece will land if dropped from a given position.
@@ -85,14 +276,23 @@ def get_drop_position(game, piece, x):
     Returns:
         int: Y position where the piece will land
     """
+    piece_type, dir = piece['type'], piece['dir']
+    if x in piece_type.x_range(dir, game.width):
+        y = get_landing_position(game.board, piece_type, x, dir, game.column_heights, game.height)
+        return 0 if y is None else y
+    
+    # Off the board the piece is blocked at once
     y = 0
-    while not game.is_occupied(piece['type'], x, y + 1, piece['dir']):
+    while not game.is_occupied(piece_type, x, y + 1, dir):
         y += 1
     return y
 
 def get_possible_moves(game, piece, board_state=None):
     """
     Generate all possible moves for the current piece.
+    Only rotations with distinct shapes and x positions between the walls
+    are tried, so each final placement is generated once. Pieces are
+    dropped onto board_state when it is given.
     
     Args:
         game (Game): The game object
@@ -102,10 +302,31 @@ def get_possible_moves(game, piece, board_state=None):
     Returns:
         list: List of possible moves with their resulting board states
     """
-    moves = []
-    rotations = [0, 1, 2, 3]  # All possible rotations
-    current_state = board_state if board_state is not None else game.board
+    return list(iter_possible_moves(game, piece, board_state))
+
+def iter_possible_moves(game, piece, board_state=None):
+    """
+    Generate the moves of get_possible_moves one at a time.
+    Each resulting board is only copied when its move is requested,
+    so callers that drop a move before asking for the next one keep
+    a single board alive.
+    
+    Args:
+        game (Game): The game object
+        piece (dict): The piece to evaluate
+        board_state (list, optional): Custom board state to use. Defaults to the game's current board.
+        
+    Yields:
+        dict: Each possible move with its resulting board state
+    """
+    rotations = piece['type'].distinct_dirs  # Rotations with different shapes
     width, height = game.width, game.height
+    if board_state is not None:
+        current_state = board_state
+        column_heights = get_column_heights(board_state, width, height)
+    else:
+        current_state = game.board
+        column_heights = game.column_heights
     
     # For each rotation of the piece
     for dir in rotations:
@@ -117,12 +338,12 @@ def get_possible_moves(game, piece, board_state=None):
             'y': piece['y']
         }
         
-        # For each horizontal position
-        for x in range(-3, width + 3):  # Allow for piece to extend beyond edges
-            y = get_drop_position(game, rotated_piece, x)
+        # For each horizontal position where the piece fits between the walls
+        for x in piece['type'].x_range(dir, width):
+            y = get_landing_position(current_state, piece['type'], x, dir, column_heights, height)
             
             # Check if the piece can be placed here
-            if not game.is_occupied(rotated_piece['type'], x, y, dir):
+            if y is not None:
                 # Create a copy of the board
                 new_board = copy_board(current_state, width, height)
                 
@@ -131,14 +352,170 @@ def get_possible_moves(game, piece, board_state=None):
                     if 0 <= block_x < width and 0 <= block_y < height:
                         new_board[block_x][block_y] = rotated_piece['type']
                 
-                moves.append({
+                yield {
                     'piece': rotated_piece,
                     'x': x,
                     'y': y,
                     'board': new_board
-                })
+                }
+
+def get_placements(board, piece):
+    """
+    Generate all placements of a piece on a search board without copying it.
+    Tries the same rotations and positions as get_possible_moves.
+    
+    Args:
+        board (Game): The search board, e.g. game.clone()
+        piece (dict): The piece to place
+        
+    Yields:
+        tuple: (dir, x, y) for each valid placement
+    """
+    piece_type = piece['type']
+    cells, column_heights, height = board.board, board.column_heights, board.height
+    for dir in piece_type.distinct_dirs:
+        for x in piece_type.x_range(dir, board.width):
+            y = get_landing_position(cells, piece_type, x, dir, column_heights, height)
+            if y is not None:
+                yield dir, x, y
+
+def get_reachable_placements(board, piece):
+    """
+    Find the placements a piece can actually reach from where it is.
+    Runs a breadth-first search over (x, y, dir) states with the moves of
+    Game.move and Game.rotate, so tucks and slides under overhangs are
+    found and sealed-off positions are not. A placement is a reachable
+    state that cannot move down. Visited states are kept as one bitmask of
+    x positions per row and rotation. Results are memoized per board size
+    and hash, piece and start state.
+    
+    Args:
+        board (Game): The search board, e.g. game.clone()
+        piece (dict): The piece to place, at its current position
+        
+    Returns:
+        tuple: (dir, x, y) for each distinct final placement, in search order
+    """
+    piece_type = piece['type']
+    start = (piece['x'], piece['y'], piece['dir'])
+    key = (board.width, board.height, board.board_hash, piece_type, start)
+    cached = _reachability_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    is_occupied = board.is_occupied
+    visited = [0] * (board.height * 4)  # Bitmask of visited x positions per (y, dir)
+    placements = []
+    seen = set()
+    queue = deque()
+    if not is_occupied(piece_type, *start):
+        x, y, dir = start
+        visited[y * 4 + dir] = 1 << (x + WALL_PAD)
+        queue.append(start)
+    
+    while queue:
+        x, y, dir = queue.popleft()
+        for state in ((x - 1, y, dir), (x + 1, y, dir), (x, y + 1, dir), (x, y, (dir + 1) % 4)):
+            if not is_occupied(piece_type, *state):
+                row, bit = state[1] * 4 + state[2], 1 << (state[0] + WALL_PAD)
+                if not visited[row] & bit:
+                    visited[row] |= bit
+                    queue.append(state)
+        
+        if is_occupied(piece_type, x, y + 1, dir):
+            # Rotations with the same shape give the same placement
+            shape = piece_type.shape_dirs[dir]
+            min_col, min_row = piece_type.bounds[dir][:2]
+            footprint = (shape, x + min_col, y + min_row)
+            if footprint not in seen:
+                seen.add(footprint)
+                placements.append((dir, x, y))
+    
+    if len(_reachability_cache) >= REACHABILITY_CACHE_SIZE:
+        _reachability_cache.clear()
+    _reachability_cache[key] = placements = tuple(placements)
+    return placements
+
+def make_move(piece, dir, x, y):
+    """
+    Build a move in the format returned by get_possible_moves, without a board.
+    
+    Args:
+        piece (dict): The piece being placed
+        dir (int): Rotation direction of the placement
+        x (int): X position of the placement
+        y (int): Y position of the placement
+        
+    Returns:
+        dict: The move
+    """
+    return {
+        'piece': {
+            'type': piece['type'],
+            'dir': dir,
+            'x': piece['x'],
+            'y': piece['y']
+        },
+        'x': x,
+        'y': y
+    }
+
+class EvaluationCache:
+    """
+    Bounded LRU cache of placement lists, keyed by the Zobrist hash of the
+    board. Keep one per game and pass it to every decision: the placements
+    of the next piece below the chosen move, and boards reached by different
+    move orders, are then generated once.
+    Scores are not cached, as evaluate_stats is cheaper than a lookup. Only
+    a few percent of lookups hit in play, so the cache pays off only for
+    generators much slower than a lookup; get_reachable_placements already
+    memoizes its results.
+    """
+    
+    def __init__(self, capacity=EVALUATION_CACHE_SIZE):
+        """
+        Initialize an empty cache.
+        
+        Args:
+            capacity (int): Maximum number of placement lists kept
+        """
+        self.capacity = capacity
+        self.moves = OrderedDict()
+        self.hits = 0
+        self.misses = 0
     
-    return moves
+    def placements(self, board, piece, generator=get_placements):
+        """
+        Get the placements of a piece on a search board.
+        
+        Args:
+            board (Game): The search board
+            piece (dict): The piece to place, at its current position
+            generator (function): Placement generator, get_placements or
+                get_reachable_placements
+            
+        Returns:
+            tuple: (dir, x, y) for each valid placement
+        """
+        key = (board.width, board.height, board.board_hash,
+               piece['type'], piece['x'], piece['y'], piece['dir'], generator)
+        moves = self.moves.get(key)
+        if moves is not None:
+            self.moves.move_to_end(key)
+            self.hits += 1
+            return moves
+        
+        self.misses += 1
+        moves = self.moves[key] = tuple(generator(board, piece))
+        if len(self.moves) > self.capacity:
+            self.moves.popitem(last=False)
+        return moves
+    
+    def clear(self):
+        """Remove every entry and reset the hit and miss counters."""
+        self.moves.clear()
+        self.hits = 0
+        self.misses = 0
 
 def select_best_move_greedy(game, piece):
     """
@@ -166,6 +543,9 @@ def select_best_move_greedy(game, piece):
 def select_best_move(game, piece, next_piece):
     """
     Select the best move considering the current piece and the next piece.
+    Moves of both plies are streamed: only the first move, the best move
+    so far and the boards being evaluated are kept alive. Ties go to the
+    earliest generated move, as with a stable sort by score.
     
     Args:
         game (Game): The game object
@@ -175,28 +555,202 @@ def select_best_move(game, piece, next_piece):
     Returns:
         dict: The best move for the current piece
     """
+    first_move = None
+    best_move = None
+    best_score = float('-inf')
+    
     # First turn: generate all possible moves for the current piece
-    moves = get_possible_moves(game, piece)
-    for move in moves:
+    for move in iter_possible_moves(game, piece):
         move['father'] = move
+        if first_move is None:
+            first_move = move
+        
+        # Second turn: score every move of the next piece, keeping only the best
+        for next_move in iter_possible_moves(game, next_piece, move['board']):
+            score = evaluate_board(next_move['board'], game.width, game.height)
+            if score > best_score:
+                best_score = score
+                best_move = move['father']
     
-    # Second turn: for each first move, generate all possible moves for the next piece
-    new_moves = []
-    for move in moves:
-        board_after_first_move = move['board']
-        next_moves = get_possible_moves(game, next_piece, board_after_first_move)
+    if best_move:
+        return best_move
+    elif first_move:  # Fallback if no next moves
+        return first_move
+    else:
+        return None  # No valid moves
+
+def select_best_move_inplace(game, piece, next_piece, placements=get_placements, cache=None):
+    """
+    Select the best move considering the current piece and the next piece,
+    without copying a board per candidate.
+    Each placement is written into one scratch board, evaluated from the
+    board statistics and rolled back.
+    
+    Args:
+        game (Game): The game object
+        piece (dict): The current piece
+        next_piece (dict): The next piece
+        placements (function): Placement generator, get_placements or
+            get_reachable_placements
+        cache (EvaluationCache, optional): Cache of placements, reused
+            across the decisions of a game
         
-        for next_move in next_moves:
-            next_move['father'] = move['father']
-            next_move['score'] = evaluate_board(next_move['board'], game.width, game.height)
-            new_moves.append(next_move)
+    Returns:
+        dict: The best move for the current piece, without a 'board' entry
+    """
+    board = game.clone()
+    if cache is not None:
+        placements = partial(cache.placements, generator=placements)
+    first_move = None
+    best_move = None
+    best_score = float('-inf')
     
-    # Sort by score and return the father of the best move
-    new_moves.sort(key=lambda x: x['score'], reverse=True)
+    token = board.snapshot()
+    for dir, x, y in placements(board, piece):
+        if first_move is None:
+            first_move = (dir, x, y)
+        board.place(piece['type'], x, y, dir, clear_lines=False)
+        next_token = board.snapshot()
+        
+        for next_dir, next_x, next_y in placements(board, next_piece):
+            board.place(next_piece['type'], next_x, next_y, next_dir, clear_lines=False)
+            score = evaluate_stats(board.stats)
+            if score > best_score:
+                best_score = score
+                best_move = (dir, x, y)
+            board.restore(next_token)
+        
+        board.release(next_token)
+        board.restore(token)
+    board.release(token)
     
-    if new_moves:
-        return new_moves[0]['father']
-    elif moves:  # Fallback if no next moves
-        return moves[0]
+    if best_move:
+        return make_move(piece, *best_move)
+    elif first_move:  # Fallback if no next moves
+        return make_move(piece, *first_move)
     else:
-        return None  # No valid moves
\ No newline at end of file
+        return None  # No valid moves
+
+class SearchTree:
+    """
+    Two-ply search that keeps the chosen branch between decisions.
+    The second ply below the chosen move, the placements of the next piece
+    with their scores, is the first ply of the following decision, so it
+    is reused instead of generated again unless the board changed in
+    another way, e.g. by a line clear. First-ply moves are searched best
+    first, and a move is not expanded when even the best possible next
+    piece cannot lift its score to the best one found.
+    """
+    
+    def __init__(self, placements=get_placements):
+        """
+        Initialize an empty tree.
+        
+        Args:
+            placements (function): Placement generator, get_placements or
+                get_reachable_placements
+        """
+        self.placements = placements
+        self.key = None  # Board and piece the kept children belong to
+        self.children = None  # (score, dir, x, y) per placement, in generation order
+        self.reused = 0
+        self.expanded = 0
+    
+    def select_best_move(self, game, piece, next_piece):
+        """
+        Select the best move like select_best_move_inplace, reusing the
+        first ply kept by the previous decision when it applies.
+        
+        Args:
+            game (Game): The game object
+            piece (dict): The current piece
+            next_piece (dict): The next piece
+            
+        Returns:
+            dict: The best move for the current piece, without a 'board' entry
+        """
+        board = game.clone()
+        token = board.snapshot()
+        if self._key(board, piece) == self.key:
+            roots = self.children
+            self.reused += 1
+        else:
+            roots = []
+            for dir, x, y in self.placements(board, piece):
+                board.place(piece['type'], x, y, dir, clear_lines=False)
+                roots.append((evaluate_stats(board.stats), dir, x, y))
+                board.restore(token)
+            self.expanded += 1
+        
+        best = None  # (score, root index, children, child key)
+        # Stable sort: equal scores keep generation order
+        for index in sorted(range(len(roots)), key=lambda i: -roots[i][0]):
+            root_score, dir, x, y = roots[index]
+            board.place(piece['type'], x, y, dir, clear_lines=False)
+            # The small margin allows for rounding in the bound
+            if best is not None and root_score + self._max_gain(board) + 1e-9 < best[0]:
+                board.restore(token)
+                continue
+            
+            child_key = self._key(board, next_piece)
+            next_token = board.snapshot()
+            children = []
+            for next_dir, next_x, next_y in self.placements(board, next_piece):
+                board.place(next_piece['type'], next_x, next_y, next_dir, clear_lines=False)
+                children.append((evaluate_stats(board.stats), next_dir, next_x, next_y))
+                board.restore(next_token)
+            board.release(next_token)
+            board.restore(token)
+            
+            if children:
+                score = max(child[0] for child in children)
+                # Ties go to the earliest generated move
+                if best is None or score > best[0] or (score == best[0] and index < best[1]):
+                    best = (score, index, children, child_key)
+        board.release(token)
+        
+        if best:
+            self.key, self.children = best[3], best[2]
+            return make_move(piece, *roots[best[1]][1:])
+        
+        self.key = self.children = None
+        if roots:  # Fallback if no next moves
+            return make_move(piece, *roots[0][1:])
+        return None  # No valid moves
+    
+    def _max_gain(self, board):
+        """
+        Bound how much placing one more piece can raise the score of a board.
+        Without line clears the heights never drop, which costs more than
+        any drop in bumpiness gains, so a piece can only gain by completing
+        lines and, when slid under an overhang, by filling holes. Its 4
+        cells complete at most the rows whose missing cells add up to 4.
+        
+        Args:
+            board (Game): The search board
+            
+        Returns:
+            float: Upper bound on the score gain
+        """
+        width = board.width
+        cells, lines = 4, 0
+        for missing in sorted(width - count for count in board.row_counts if 0 < width - count <= 4):
+            if missing > cells:
+                break
+            cells -= missing
+            lines += 1
+        return 0.76 * lines + 0.36 * min(4, board.stats.holes)
+    
+    def _key(self, board, piece):
+        """
+        Identify a board and piece for reusing kept children.
+        
+        Args:
+            board (Game): The search board
+            piece (dict): The piece to place
+            
+        Returns:
+            tuple: Board size and hash, piece and start state of the piece
+        """
+        return (board.width, board.height, board.board_hash,
+                piece['type'], piece['x'], piece['y'], piece['dir'])
@@ -53,9 +53,9 @@ def main():
                 # Pass auto_player reference to handle_keydown
                 auto_player = handle_keydown(event.key, game, renderer, auto_player)
 
-        # Make AI move if AI mode is enabled
+        # Apply the AI move once the background planner has it
         if AI_MODE and auto_player and not game.game_over and not game.paused:
-            auto_player.make_ai_move()
+            auto_player.plan_ai_move()
 
         # Update game state
         game.update(dt)
@@ -71,6 +71,8 @@ def main():
         clock.tick(FPS)
 
     # Clean up
+    if auto_player:
+        auto_player.close()
     pygame.quit()
     sys.exit()
 
@@ -117,7 +119,8 @@ def handle_keydown(key, game, renderer, auto_player):
     # Update auto_player based on new AI_MODE
     if AI_MODE and auto_player is None:
         auto_player = AutoPlayer(game, renderer, delay=0.1)
-    elif not AI_MODE:
+    elif not AI_MODE and auto_player is not None:
+        auto_player.close()
         auto_player = None
 
     return auto_player
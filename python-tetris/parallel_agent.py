@@ -0,0 +1,150 @@
+"""
+Parallel root search for Python Tetris.
+This module spreads the first-ply moves of the two-ply search over a pool
+of worker processes that is kept alive between decisions.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from tetromino import ALL_PIECES
+from game import Game
+from heuristic_agent import evaluate_stats, get_placements, make_move
+
+_executor = None
+_executor_workers = 0
+
+def get_executor(workers=None):
+    """
+    Get the shared worker pool, starting it on first use.
+    The pool is restarted only if a different number of workers is asked for.
+
+    Args:
+        workers (int, optional): Number of worker processes. Defaults to the CPU count.
+
+    Returns:
+        ProcessPoolExecutor: The shared pool
+    """
+    global _executor, _executor_workers
+    workers = workers or os.cpu_count() or 1
+    if _executor is None or _executor_workers != workers:
+        shutdown_executor()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+def shutdown_executor():
+    """Stop the shared worker pool, if it is running."""
+    global _executor, _executor_workers
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+        _executor_workers = 0
+
+def select_best_move_parallel(game, piece, next_piece, workers=None, placements=get_placements):
+    """
+    Select the best move like select_best_move_inplace, with the first-ply
+    moves searched in worker processes.
+    Workers receive the board packed by Game.encode_board() and a share of
+    the first-ply moves, and report the best score among their moves. Ties
+    go to the earliest generated move, so the result is the same move the
+    serial search returns.
+
+    Args:
+        game (Game): The game object
+        piece (dict): The current piece
+        next_piece (dict): The next piece
+        workers (int, optional): Number of worker processes. Defaults to the CPU count.
+        placements (function): Placement generator, get_placements or
+            get_reachable_placements
+
+    Returns:
+        dict: The best move for the current piece, without a 'board' entry
+    """
+    roots = list(placements(game, piece))
+    if not roots:
+        return None  # No valid moves
+
+    executor = get_executor(workers)
+    data = game.encode_board()
+    packed_piece, packed_next = pack_piece(piece), pack_piece(next_piece)
+    chunks = min(_executor_workers, len(roots))
+    futures = [executor.submit(_search_roots, data, game.width, game.height, packed_piece,
+                               packed_next, roots[start::chunks], start, chunks, placements)
+               for start in range(chunks)]
+
+    best = None
+    for future in futures:
+        result = future.result()
+        if result is not None and (best is None or result[0] > best[0]
+                                   or (result[0] == best[0] and result[1] < best[1])):
+            best = result
+
+    if best is None:  # Fallback if no next moves
+        return make_move(piece, *roots[0])
+    return make_move(piece, *roots[best[1]])
+
+def pack_piece(piece):
+    """
+    Convert a piece dict into a tuple that pickles without its Tetromino.
+
+    Args:
+        piece (dict): The piece
+
+    Returns:
+        tuple: (piece index, x, y, dir)
+    """
+    return (ALL_PIECES.index(piece['type']), piece['x'], piece['y'], piece['dir'])
+
+def unpack_piece(packed):
+    """
+    Convert a tuple made by pack_piece back into a piece dict.
+
+    Args:
+        packed (tuple): (piece index, x, y, dir)
+
+    Returns:
+        dict: The piece
+    """
+    index, x, y, dir = packed
+    return {'type': ALL_PIECES[index], 'x': x, 'y': y, 'dir': dir}
+
+def _search_roots(data, width, height, packed_piece, packed_next, roots, start, step, placements):
+    """
+    Worker task: score a share of the first-ply moves by their best reply.
+
+    Args:
+        data (bytes): The board packed by Game.encode_board()
+        width (int): Width of the board
+        height (int): Height of the board
+        packed_piece (tuple): The current piece, packed by pack_piece
+        packed_next (tuple): The next piece, packed by pack_piece
+        roots (list): (dir, x, y) first-ply moves to search
+        start (int): Index of the first of these moves among all first-ply moves
+        step (int): Distance between consecutive moves of this share
+        placements (function): Placement generator
+
+    Returns:
+        tuple: (score, index) of the best move of the share, or None if
+            the next piece has no placement after any of them
+    """
+    board = Game.decode_board(data, width, height)
+    piece, next_piece = unpack_piece(packed_piece), unpack_piece(packed_next)
+    piece_type, next_type = piece['type'], next_piece['type']
+    best = None
+
+    token = board.snapshot()
+    for offset, (dir, x, y) in enumerate(roots):
+        board.place(piece_type, x, y, dir, clear_lines=False)
+        next_token = board.snapshot()
+
+        for next_dir, next_x, next_y in placements(board, next_piece):
+            board.place(next_type, next_x, next_y, next_dir, clear_lines=False)
+            score = evaluate_stats(board.stats)
+            if best is None or score > best[0]:
+                best = (score, start + offset * step)
+            board.restore(next_token)
+
+        board.release(next_token)
+        board.restore(token)
+    board.release(token)
+    return best
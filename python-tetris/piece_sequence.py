@@ -0,0 +1,141 @@
+"""
+Piece sequence generators for Python Tetris.
+This module decides which piece spawns next and in which column.
+"""
+
+import random
+from tetromino import ALL_PIECES
+
+class BagSequence:
+    """
+    The default piece sequence: a shuffled bag with 4 of each piece and a
+    random spawn column, drawn from the game's own random generator.
+    """
+
+    def __init__(self, copies=4):
+        """
+        Initialize the sequence.
+
+        Args:
+            copies (int): Number of copies of each piece in a bag
+        """
+        self.copies = copies
+        self.rng = None
+        self.width = 0
+        self.bag = []
+
+    def reset(self, rng, width):
+        """
+        Start a new sequence.
+
+        Args:
+            rng (random.Random): Random generator to draw from
+            width (int): Width of the board the pieces spawn on
+        """
+        self.rng = rng
+        self.width = width
+        self.bag = []
+
+    def next_piece(self):
+        """
+        Draw the next piece from the bag.
+        If the bag is empty, refill it with copies of each piece.
+
+        Returns:
+            tuple: (piece, x) - The Tetromino and its spawn column
+        """
+        if not self.bag:
+            self.bag = list(ALL_PIECES) * self.copies
+            self.rng.shuffle(self.bag)
+
+        piece = self.bag.pop()
+        return piece, self.rng.randint(0, self.width - piece.size)
+
+    def get_state(self):
+        """Return the pieces left in the bag, the generator is saved by the game."""
+        return list(self.bag)
+
+    def set_state(self, state):
+        """Restore the pieces left in the bag."""
+        self.bag = list(state)
+
+class PieceStream:
+    """
+    Replays a pregenerated piece sequence.
+    The stream is stored as bytes, two per piece: the index of the piece in
+    ALL_PIECES and its spawn column. It can be written to disk or sent to
+    other processes so many games play exactly the same pieces.
+    """
+
+    def __init__(self, data):
+        """
+        Initialize the stream.
+
+        Args:
+            data (bytes): Pairs of (piece index, spawn column) bytes
+        """
+        self.data = bytes(data)
+        self.position = 0
+
+    @classmethod
+    def generate(cls, count, width=10, seed=None, sequence=None):
+        """
+        Pregenerate a stream of pieces.
+
+        Args:
+            count (int): Number of pieces to generate
+            width (int): Width of the board the pieces spawn on
+            seed (int, optional): Seed for the random generator
+            sequence (object, optional): Sequence to draw from. Defaults to BagSequence.
+
+        Returns:
+            PieceStream: The generated stream
+        """
+        if sequence is None:
+            sequence = BagSequence()
+        sequence.reset(random.Random(seed), width)
+        data = bytearray()
+        for _ in range(count):
+            piece, x = sequence.next_piece()
+            data.append(ALL_PIECES.index(piece))
+            data.append(x)
+        return cls(data)
+
+    def __len__(self):
+        """Return the number of pieces in the stream."""
+        return len(self.data) // 2
+
+    def reset(self, rng, width):
+        """
+        Rewind to the start of the stream.
+
+        Args:
+            rng (random.Random): Unused, the stream is already fixed
+            width (int): Unused, the spawn columns are already fixed
+        """
+        self.position = 0
+
+    def next_piece(self):
+        """
+        Read the next piece from the stream.
+
+        Returns:
+            tuple: (piece, x) - The Tetromino and its spawn column
+
+        Raises:
+            IndexError: If every piece of the stream has been played
+        """
+        if self.position >= len(self):
+            raise IndexError(f"Piece stream exhausted after {len(self)} pieces")
+
+        index = 2 * self.position
+        self.position += 1
+        return ALL_PIECES[self.data[index]], self.data[index + 1]
+
+    def get_state(self):
+        """Return the read position in the stream."""
+        return self.position
+
+    def set_state(self, state):
+        """Restore the read position in the stream."""
+        self.position = state
@@ -0,0 +1,121 @@
+"""
+Background move planning for Python Tetris.
+This module searches for the AI move in a worker process so the game loop
+only has to poll for a finished plan instead of waiting for the search.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from game import Game
+from heuristic_agent import select_best_move_inplace
+from parallel_agent import pack_piece, unpack_piece
+
+class Planner:
+    """
+    Plans the move of the current piece in the background.
+    A plan is started as soon as a piece spawns and belongs to the board and
+    pieces it was computed for. When the board or the pieces change before
+    it is applied, it is cancelled or, if already running, discarded.
+    """
+
+    def __init__(self, game, agent=select_best_move_inplace, executor=None):
+        """
+        Initialize the planner.
+
+        Args:
+            game (Game): The game to plan for
+            agent (function): Move selection function taking (game, piece, next_piece),
+                defined at module level so it can be sent to a worker process
+            executor (Executor, optional): Executor to plan on. Defaults to a
+                single worker process owned by the planner.
+        """
+        self.game = game
+        self.agent = agent
+        self.owns_executor = executor is None
+        self.executor = executor or ProcessPoolExecutor(max_workers=1)
+        self.future = None
+        self.key = None  # State the pending plan was started for
+
+    def _state_key(self):
+        """
+        Describe the state a plan depends on.
+
+        Returns:
+            tuple: (board hash, current piece type, next piece type)
+        """
+        game = self.game
+        return (game.board_hash, game.current_piece['type'], game.next_piece['type'])
+
+    def poll(self):
+        """
+        Apply the plan for the current piece if it is ready, without waiting.
+        Starts a new plan when none is pending for the current state.
+
+        Returns:
+            bool: True if a move was applied
+        """
+        game = self.game
+        if game.game_over:
+            self.cancel()
+            return False
+
+        key = self._state_key()
+        if self.key != key:
+            # The board or the pieces changed, the pending plan is stale
+            self.cancel()
+            self.key = key
+            self.future = self.executor.submit(
+                _plan, game.encode_board(), game.width, game.height,
+                pack_piece(game.current_piece), pack_piece(game.next_piece), self.agent)
+            return False
+
+        if not self.future.done():
+            return False
+
+        move = self.future.result()
+        self.future = None
+        self.key = None
+        if move is None:
+            return False
+
+        # Apply the move, as AutoPlayer.make_ai_move does
+        game.current_piece['dir'], game.current_piece['x'], game.current_piece['y'] = move
+        game.drop()
+        return True
+
+    def cancel(self):
+        """Drop the pending plan, if any."""
+        if self.future is not None:
+            self.future.cancel()
+        self.future = None
+        self.key = None
+
+    def shutdown(self):
+        """
+        Drop the pending plan and stop the worker process if the planner owns it.
+        Returns at once: a search already running is not waited for, the
+        worker exits when it finishes.
+        """
+        self.cancel()
+        if self.owns_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+def _plan(data, width, height, packed_piece, packed_next, agent):
+    """
+    Worker task: select the move for a packed board and pieces.
+
+    Args:
+        data (bytes): The board packed by Game.encode_board()
+        width (int): Width of the board
+        height (int): Height of the board
+        packed_piece (tuple): The current piece, packed by pack_piece
+        packed_next (tuple): The next piece, packed by pack_piece
+        agent (function): Move selection function
+
+    Returns:
+        tuple: (dir, x, y) of the selected move, or None if there is none
+    """
+    board = Game.decode_board(data, width, height)
+    move = agent(board, unpack_piece(packed_piece), unpack_piece(packed_next))
+    if move is None:
+        return None
+    return (move['piece']['dir'], move['x'], move['y'])
@@ -0,0 +1,196 @@
+"""
+Game recording and replay for Python Tetris.
+This module stores games as a seed plus packed placements and rebuilds
+any intermediate game state by replaying them headlessly.
+"""
+
+import random
+import struct
+from tetromino import ALL_PIECES
+from game import Game, WALL_PAD
+
+# File layout: header followed by one packed placement per locked piece
+MAGIC = b'TTRP'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBxQI')  # magic, version, width, height, seed, count
+PLACEMENT = struct.Struct('<BBB')  # piece << 2 | rotation, x + WALL_PAD, y
+
+class ReplayRecorder:
+    """
+    Records every piece a game locks, whether it was placed by step(),
+    by the AI or by a player.
+    """
+
+    def __init__(self):
+        """Initialize an empty recorder."""
+        self.game = None
+        self.seed = 0
+        self.width = 0
+        self.height = 0
+        self.data = bytearray()
+        self.count = 0
+
+    def start(self, game, seed=None):
+        """
+        Reset the game with a seed and start recording it.
+
+        Args:
+            game (Game): The game to record
+            seed (int, optional): Seed to reset the game with. Defaults to a random seed.
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.stop()
+        self.game = game
+        self.seed = seed
+        self.width = game.width
+        self.height = game.height
+        self.data = bytearray()
+        self.count = 0
+        game.reset(seed)
+        game.recorder = self
+
+    def stop(self):
+        """Stop recording, the recorded placements are kept."""
+        if self.game is not None:
+            self.game.recorder = None
+            self.game = None
+
+    def record(self, piece):
+        """
+        Append a placement. Called by the game when it locks a piece.
+
+        Args:
+            piece (dict): The piece being locked
+        """
+        index = ALL_PIECES.index(piece['type'])
+        self.data += PLACEMENT.pack(index << 2 | piece['dir'], piece['x'] + WALL_PAD, piece['y'])
+        self.count += 1
+
+    def to_bytes(self):
+        """
+        Serialize the recording.
+
+        Returns:
+            bytes: Header followed by the packed placements
+        """
+        header = HEADER.pack(MAGIC, VERSION, self.width, self.height, self.seed, self.count)
+        return header + bytes(self.data)
+
+    def save(self, path):
+        """
+        Write the recording to a file.
+
+        Args:
+            path (str): Path of the file to write
+        """
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+class Replay:
+    """
+    A recorded game that can be fast-forwarded to any placement.
+    """
+
+    def __init__(self, width, height, seed, placements):
+        """
+        Initialize a replay.
+
+        Args:
+            width (int): Width of the recorded board
+            height (int): Height of the recorded board
+            seed (int): Seed the game was reset with
+            placements (list): (piece index, rotation, x, y) per locked piece
+        """
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.placements = placements
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Parse a recording.
+
+        Args:
+            data (bytes): Data written by ReplayRecorder.to_bytes
+
+        Returns:
+            Replay: The parsed replay
+
+        Raises:
+            ValueError: If the data is not a supported recording
+        """
+        if len(data) < HEADER.size:
+            raise ValueError("Not a Tetris replay: data shorter than the header")
+        magic, version, width, height, seed, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a Tetris replay or unsupported version")
+
+        body = data[HEADER.size:HEADER.size + count * PLACEMENT.size]
+        body = body[:len(body) - len(body) % PLACEMENT.size]  # Drop a partial placement
+        placements = []
+        for packed, x, y in PLACEMENT.iter_unpack(body):
+            placements.append((packed >> 2, packed & 3, x - WALL_PAD, y))
+        if len(placements) != count:
+            raise ValueError(f"Replay truncated: {len(placements)} of {count} placements")
+        return cls(width, height, seed, placements)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a recording from a file.
+
+        Args:
+            path (str): Path of the file to read
+
+        Returns:
+            Replay: The parsed replay
+        """
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def __len__(self):
+        """Return the number of recorded placements."""
+        return len(self.placements)
+
+    def play(self, count=None, sequence=None):
+        """
+        Replay placements headlessly, yielding the game after each one.
+        The same game object is yielded every time and keeps changing.
+
+        Args:
+            count (int, optional): Number of placements to replay. Defaults to all.
+            sequence (object, optional): Piece sequence the game was recorded with,
+                if it was not the default BagSequence
+
+        Yields:
+            Game: The game after each placement
+
+        Raises:
+            ValueError: If the replayed pieces diverge from the recording
+        """
+        game = Game(self.width, self.height, headless=True, seed=self.seed, sequence=sequence)
+        for i, (piece, rotation, x, y) in enumerate(self.placements[:count]):
+            if game.current_piece['type'] is not ALL_PIECES[piece]:
+                raise ValueError(f"Replay diverged at placement {i}")
+            game.step(rotation, x, y)
+            yield game
+
+    def game_at(self, count, sequence=None):
+        """
+        Rebuild the game state after a number of placements.
+
+        Args:
+            count (int): Number of placements to replay
+            sequence (object, optional): Piece sequence the game was recorded with
+
+        Returns:
+            Game: The game after count placements
+        """
+        game = None
+        for game in self.play(count, sequence):
+            pass
+        if game is None:
+            game = Game(self.width, self.height, headless=True, seed=self.seed, sequence=sequence)
+        return game
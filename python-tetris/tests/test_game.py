@@ -0,0 +1,185 @@
+"""
+Regression tests for the incremental state kept by Game: snapshot/restore,
+the Zobrist hash and replay round-trips.
+
+Run from the python-tetris directory with: python -m unittest discover -s tests -t .
+"""
+
+import random
+import unittest
+from game import Game, board_hash
+from heuristic_agent import get_placements, select_best_move_inplace
+from piece_sequence import PieceStream
+from replay import Replay, ReplayRecorder
+
+def game_state(game):
+    """
+    Collect everything snapshot() and restore() must bring back.
+
+    Args:
+        game (Game): The game
+
+    Returns:
+        tuple: The board, its counters and hash, the scores, the pieces and the generators
+    """
+    return ([column[:] for column in game.board], game.bitboard[:], game.row_counts[:],
+            game.column_heights[:], game.column_fills[:], game.board_hash,
+            game.score, game.rows, game.game_over, dict(game.current_piece),
+            dict(game.next_piece), game.pieces_drawn, game.rng.getstate(),
+            game.sequence.get_state())
+
+def play_random(game, rng, pieces):
+    """
+    Lock random placements of the current piece with step().
+
+    Args:
+        game (Game): The game to play
+        rng (random.Random): Chooses the placements
+        pieces (int): Number of pieces to lock
+    """
+    for _ in range(pieces):
+        if game.game_over:
+            return
+        placements = list(get_placements(game, game.current_piece))
+        if not placements:
+            return
+        dir, x, y = rng.choice(placements)
+        game.step(dir, x, y)
+
+def play_ai(game, pieces):
+    """
+    Lock the placements chosen by select_best_move_inplace, which clear lines.
+
+    Args:
+        game (Game): The game to play
+        pieces (int): Number of pieces to lock
+    """
+    for _ in range(pieces):
+        if game.game_over:
+            return
+        move = select_best_move_inplace(game, game.current_piece, game.next_piece)
+        game.step(move['piece']['dir'], move['x'], move['y'])
+
+class SnapshotTest(unittest.TestCase):
+    """snapshot() and restore() undo placements, line clears and piece draws."""
+
+    def test_restore_after_steps(self):
+        rng = random.Random(1)
+        for seed in range(5):
+            game = Game(headless=True, seed=seed)
+            play_ai(game, 30)
+            before = game_state(game)
+            token = game.snapshot()
+            # step() clears lines and draws pieces from the generator
+            play_random(game, rng, 12)
+            game.restore(token)
+            self.assertEqual(game_state(game), before)
+            # The snapshot stays live and can be restored again
+            play_ai(game, 5)
+            game.restore(token)
+            game.release(token)
+            self.assertEqual(game_state(game), before)
+            self.assertIsNone(game._journal)
+
+    def test_nested_snapshots(self):
+        rng = random.Random(2)
+        game = Game(headless=True, seed=7)
+        play_ai(game, 20)
+        outer_state = game_state(game)
+        outer = game.snapshot()
+        play_random(game, rng, 3)
+        inner_state = game_state(game)
+        inner = game.snapshot()
+        play_random(game, rng, 4)
+        game.restore(inner)
+        self.assertEqual(game_state(game), inner_state)
+        play_random(game, rng, 2)
+        game.release(inner)
+        game.restore(outer)
+        game.release(outer)
+        self.assertEqual(game_state(game), outer_state)
+
+    def test_restore_matches_unsearched_game(self):
+        # Searching with place() and restore() must not change the pieces drawn later
+        searched = Game(headless=True, seed=3)
+        plain = Game(headless=True, seed=3)
+        for _ in range(40):
+            move = select_best_move_inplace(searched, searched.current_piece, searched.next_piece)
+            token = searched.snapshot()
+            play_random(searched, random.Random(0), 3)
+            searched.restore(token)
+            searched.release(token)
+            searched.step(move['piece']['dir'], move['x'], move['y'])
+            plain.step(move['piece']['dir'], move['x'], move['y'])
+        self.assertEqual(game_state(searched), game_state(plain))
+
+class SequenceTest(unittest.TestCase):
+    """Games given a piece sequence play their own copy of it."""
+
+    def test_shared_stream(self):
+        stream = PieceStream.generate(50, seed=9)
+        games = [Game(headless=True, sequence=stream) for _ in range(2)]
+        for _ in range(20):
+            for game in games:
+                play_ai(game, 1)
+        self.assertEqual(game_state(games[0])[:-2], game_state(games[1])[:-2])
+        self.assertEqual(games[0].pieces_drawn, 22)
+        self.assertEqual(stream.position, 0)
+
+    def test_empty_stream(self):
+        with self.assertRaises(IndexError):
+            Game(headless=True, sequence=PieceStream(b''))
+
+class ZobristTest(unittest.TestCase):
+    """The incremental board_hash matches a hash computed from scratch."""
+
+    def test_incremental_hash(self):
+        rng = random.Random(4)
+        for seed in range(5):
+            game = Game(headless=True, seed=seed)
+            for _ in range(60):
+                play_random(game, rng, 1)
+                self.assertEqual(game.board_hash, board_hash(game.board, game.width, game.height))
+                if game.game_over:
+                    break
+
+    def test_hash_after_restore(self):
+        game = Game(headless=True, seed=5)
+        play_ai(game, 40)
+        expected = game.board_hash
+        token = game.snapshot()
+        play_random(game, random.Random(5), 10)
+        game.restore(token)
+        game.release(token)
+        self.assertEqual(game.board_hash, expected)
+        self.assertEqual(board_hash(game.board, game.width, game.height), expected)
+
+class ReplayTest(unittest.TestCase):
+    """Recordings replay to the same game."""
+
+    def test_round_trip(self):
+        rng = random.Random(6)
+        for width, height in ((10, 20), (6, 12)):
+            game = Game(width, height, headless=True)
+            recorder = ReplayRecorder()
+            recorder.start(game, seed=width * 1000 + height)
+            play_random(game, rng, 60)
+            recorder.stop()
+
+            replay = Replay.from_bytes(recorder.to_bytes())
+            self.assertEqual(len(replay), recorder.count)
+            replayed = replay.game_at(len(replay))
+            self.assertEqual(game_state(replayed), game_state(game))
+
+    def test_truncated_recording(self):
+        game = Game(headless=True)
+        recorder = ReplayRecorder()
+        recorder.start(game, seed=8)
+        play_ai(game, 5)
+        data = recorder.to_bytes()
+        for end in (len(data) - 1, len(data) - 3, 10):
+            with self.assertRaises(ValueError):
+                Replay.from_bytes(data[:end])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,12 +7,74 @@ This module defines the seven standard Tetromino pieces and their rotations.
 UP, RIGHT, LEFT, DOWN = 0, 1, 2, 3
 MIN_DIR, MAX_DIR = 0, 3
 
+def _decode_cells(blocks):
+    """
+    Decode a 16-bit rotation mask into block offsets.
+    
+    Args:
+        blocks (int): The 16-bit mask of a single rotation
+        
+    Returns:
+        tuple: (col, row) offsets of the occupied blocks, in bit order
+    """
+    return tuple((i % 4, i // 4) for i in range(16) if blocks & (0x8000 >> i))
+
+def _row_masks(cells):
+    """
+    Build per-row bitmasks for a rotation.
+    
+    Bit c of each row mask is set when column c of that row is occupied,
+    so a mask shifted left by x lines up with a board row bitmask.
+    
+    Args:
+        cells (tuple): (col, row) offsets of the rotation
+        
+    Returns:
+        tuple: (row, mask) pairs for the non-empty rows only, top to bottom
+    """
+    masks = {}
+    for col, row in cells:
+        masks[row] = masks.get(row, 0) | (1 << col)
+    return tuple(sorted(masks.items()))
+
+def _column_profile(cells, pick):
+    """
+    Build a per-column profile for a rotation.
+    
+    Args:
+        cells (tuple): (col, row) offsets of the rotation
+        pick (function): max for the bottom profile, min for the top profile
+        
+    Returns:
+        tuple: (col, row) pairs for the occupied columns, left to right
+    """
+    rows = {}
+    for col, row in cells:
+        rows[col] = pick(rows[col], row) if col in rows else row
+    return tuple(sorted(rows.items()))
+
 class Tetromino:
     """
     Represents a Tetromino piece with its shape, color, and rotation states.
     Uses the same bit representation as the JavaScript version for consistency.
+    
+    The geometry of every rotation is decoded once when the piece is created
+    and stored as tuples indexed by direction:
+    
+    - cells: (col, row) offsets of the four blocks
+    - row_masks: (row, mask) pairs, bit c of mask is column c
+    - bounds: (min_col, min_row, max_col, max_row) bounding box
+    - bottom_profile: (col, lowest row) pairs for each occupied column
+    - top_profile: (col, highest row) pairs for each occupied column
+    
+    distinct_dirs lists the rotations with different shapes, e.g. a single
+    one for O, since the other rotations only repeat the same placements.
+    shape_dirs maps each rotation to the first rotation with the same shape.
     """
     
+    __slots__ = ('size', 'blocks', 'color', 'cells', 'row_masks', 'bounds',
+                 'bottom_profile', 'top_profile', 'distinct_dirs', 'shape_dirs')
+    
     def __init__(self, size, blocks, color):
         """
         Initialize a new Tetromino piece.
@@ -23,8 +85,44 @@ class Tetromino:
             color (str): The color of the piece
         """
         self.size = size
-        self.blocks = blocks
+        self.blocks = tuple(blocks)
         self.color = color
+        self.cells = tuple(_decode_cells(b) for b in self.blocks)
+        self.row_masks = tuple(_row_masks(cells) for cells in self.cells)
+        self.bounds = tuple(
+            (min(c for c, r in cells), min(r for c, r in cells),
+             max(c for c, r in cells), max(r for c, r in cells))
+            for cells in self.cells)
+        self.bottom_profile = tuple(_column_profile(cells, max) for cells in self.cells)
+        self.top_profile = tuple(_column_profile(cells, min) for cells in self.cells)
+        
+        shapes = []
+        for dir, (min_col, min_row, max_col, max_row) in enumerate(self.bounds):
+            shapes.append(frozenset((col - min_col, row - min_row) for col, row in self.cells[dir]))
+        self.shape_dirs = tuple(shapes.index(shape) for shape in shapes)
+        self.distinct_dirs = tuple(dir for dir in range(4) if self.shape_dirs[dir] == dir)
+    
+    def __copy__(self):
+        """Pieces are shared definitions, so copies return the same object."""
+        return self
+    
+    def __deepcopy__(self, memo):
+        """Pieces are shared definitions, so deep copies return the same object."""
+        return self
+    
+    def x_range(self, dir, width):
+        """
+        Get the x positions at which a rotation fits between the walls.
+        
+        Args:
+            dir (int): The rotation direction (0-3)
+            width (int): Width of the board
+            
+        Returns:
+            range: The valid x positions
+        """
+        min_col, min_row, max_col, max_row = self.bounds[dir]
+        return range(-min_col, width - max_col)
     
     def each_block(self, x, y, dir):
         """
@@ -38,23 +136,7 @@ class Tetromino:
         Returns:
             list: List of (x, y) coordinates for each block in the piece
         """
-        result = []
-        bit = 0x8000
-        row = 0
-        col = 0
-        blocks = self.blocks[dir]
-        
-        while bit > 0:
-            if blocks & bit:
-                result.append((x + col, y + row))
-            if col + 1 == 4:
-                col = 0
-                row += 1
-            else:
-                col += 1
-            bit >>= 1
-        
-        return result
+        return [(x + col, y + row) for col, row in self.cells[dir]]
 
 # Define the seven standard Tetromino pieces
 # Using the same bit representation as the JavaScript version
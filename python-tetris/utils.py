@@ -3,9 +3,22 @@ Utility functions for Python Tetris.
 This module provides functions for automated gameplay and performance testing.
 """
 
+import math
+import os
+import statistics
 import time
-import pygame
-from heuristic_agent import select_best_move
+from concurrent.futures import ProcessPoolExecutor
+from game import Game
+from heuristic_agent import select_best_move_inplace
+from planner import Planner
+
+try:
+    import pygame
+except ImportError:  # Headless runs do not need pygame
+    pygame = None
+
+# Pieces after which a batch game is stopped, so strong games still finish
+BATCH_MAX_PIECES = 2000
 
 class AutoPlayer:
     """
@@ -27,6 +40,7 @@ class AutoPlayer:
         self.total_score = 0
         self.total_rows = 0
         self.games_played = 0
+        self.planner = None  # Started by the first plan_ai_move call
         
     def play_games(self, num_games=5, callback=None):
         """
@@ -74,6 +88,8 @@ class AutoPlayer:
     def play_single_game(self):
         """
         Play a single game automatically using the AI agent.
+        Headless games are advanced placement by placement with Game.step,
+        without calling update, rendering or sleeping.
         
         Returns:
             tuple: (score, rows) - The final score and rows cleared
@@ -82,6 +98,9 @@ class AutoPlayer:
         self.game.reset()
         
         # Play until game over
+        while self.game.headless and not self.game.game_over:
+            self.make_ai_move()
+        
         while not self.game.game_over:
             # Make AI move
             self.make_ai_move()
@@ -114,16 +133,149 @@ class AutoPlayer:
         Make a single AI move.
         """
         # Get the best move
-        best_move = select_best_move(self.game, self.game.current_piece, self.game.next_piece)
+        best_move = select_best_move_inplace(self.game, self.game.current_piece, self.game.next_piece)
         
-        if best_move:
+        if self.game.headless:
+            piece = best_move['piece'] if best_move else self.game.current_piece
+            x = best_move['x'] if best_move else piece['x']
+            self.game.step(piece['dir'], x)
+        elif best_move:
             # Apply the move
             self.game.current_piece['x'] = best_move['x']
             self.game.current_piece['y'] = best_move['y']
             self.game.current_piece['dir'] = best_move['piece']['dir']
             self.game.drop()
+    
+    def plan_ai_move(self):
+        """
+        Make an AI move without blocking the caller.
+        The move is searched by a background Planner; this applies it once
+        it is ready and otherwise returns at once, so it can be called
+        every frame.
+        
+        Returns:
+            bool: True if a move was applied
+        """
+        if self.planner is None:
+            self.planner = Planner(self.game)
+        return self.planner.poll()
+    
+    def close(self):
+        """Stop the background planner, if it was started."""
+        if self.planner is not None:
+            self.planner.shutdown()
+            self.planner = None
+
+def play_seeded_game(seed, width=10, height=20, max_pieces=BATCH_MAX_PIECES):
+    """
+    Play one headless game with the AI agent, without rendering or sleeping.
+    
+    Args:
+        seed (int): Seed of the game's random generator
+        width (int): Width of the board
+        height (int): Height of the board
+        max_pieces (int, optional): Stop after this many pieces, None to play until game over
+        
+    Returns:
+        dict: The seed, score, rows, pieces placed, whether the game ended
+            and wall time of the game
+    """
+    start = time.perf_counter()
+    game = Game(width, height, headless=True, seed=seed)
+    auto_player = AutoPlayer(game, delay=0)
+    pieces = 0
+    while not game.game_over and (max_pieces is None or pieces < max_pieces):
+        auto_player.make_ai_move()
+        pieces += 1
+    
+    return {
+        'seed': seed,
+        'score': game.score,
+        'rows': game.rows,
+        'pieces': pieces,
+        'game_over': game.game_over,
+        'time': time.perf_counter() - start
+    }
 
-def run_performance_test(game, renderer=None, num_games=5, callback=None):
+def run_batch(num_games, width=10, height=20, seed=0, workers=None, max_pieces=BATCH_MAX_PIECES,
+              callback=None):
+    """
+    Play seeded headless games across a pool of worker processes.
+    Game i uses seed + i, so a batch is reproducible whatever the number of workers.
+    
+    Args:
+        num_games (int): Number of games to play
+        width (int): Width of the board
+        height (int): Height of the board
+        seed (int): Seed of the first game
+        workers (int, optional): Number of worker processes. Defaults to the CPU count.
+        max_pieces (int, optional): Stop each game after this many pieces, None to play until game over
+        callback (function, optional): Callback function to be called with results
+        
+    Returns:
+        dict: Performance results, with the spread and 95% confidence
+            intervals of the score and rows, the number of games stopped by
+            max_pieces, and the per-game results
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Starting batch of {num_games} games on {workers} workers...")
+    
+    start = time.perf_counter()
+    seeds = range(seed, seed + num_games)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        games = list(executor.map(play_seeded_game, seeds, [width] * num_games,
+                                  [height] * num_games, [max_pieces] * num_games,
+                                  chunksize=max(1, num_games // (workers * 8))))
+    wall_time = time.perf_counter() - start
+    
+    scores = [result['score'] for result in games]
+    rows = [result['rows'] for result in games]
+    total_pieces = sum(result['pieces'] for result in games)
+    capped_games = sum(not result['game_over'] for result in games)
+    
+    def spread(values):
+        # Sample standard deviation and normal 95% confidence interval of the mean
+        mean = statistics.fmean(values)
+        stddev = statistics.stdev(values) if len(values) > 1 else 0.0
+        margin = 1.96 * stddev / math.sqrt(len(values))
+        return mean, stddev, (mean - margin, mean + margin)
+    
+    avg_score, score_stddev, score_ci = spread(scores)
+    avg_rows, rows_stddev, rows_ci = spread(rows)
+    
+    results = {
+        'games': num_games,
+        'total_score': sum(scores),
+        'total_rows': sum(rows),
+        'avg_score': avg_score,
+        'avg_rows': avg_rows,
+        'score_stddev': score_stddev,
+        'score_ci': score_ci,
+        'rows_stddev': rows_stddev,
+        'rows_ci': rows_ci,
+        'total_pieces': total_pieces,
+        'capped_games': capped_games,
+        'wall_time': wall_time,
+        'pieces_per_second': total_pieces / wall_time,
+        'results': games
+    }
+    
+    print(f"All {num_games} games completed in {wall_time:.2f}s.")
+    print(f"Average Score: {avg_score:.2f} ± {score_stddev:.2f} "
+          f"(95% CI {score_ci[0]:.2f} to {score_ci[1]:.2f})")
+    print(f"Average Rows: {avg_rows:.2f} ± {rows_stddev:.2f} "
+          f"(95% CI {rows_ci[0]:.2f} to {rows_ci[1]:.2f})")
+    print(f"Pieces per second: {results['pieces_per_second']:.1f}")
+    if capped_games:
+        print(f"{capped_games} games reached the {max_pieces} piece limit.")
+    
+    if callback and callable(callback):
+        callback(results)
+    
+    return results
+
+def run_performance_test(game, renderer=None, num_games=5, callback=None, parallel=False,
+                         workers=None, seed=0, max_pieces=BATCH_MAX_PIECES):
     """
     Run a performance test with the current settings.
     
@@ -132,12 +284,21 @@ def run_performance_test(game, renderer=None, num_games=5, callback=None):
         renderer (Renderer, optional): The renderer object for visualization
         num_games (int): Number of games to play
         callback (function, optional): Callback function to be called with results
+        parallel (bool): Play seeded headless games with run_batch instead,
+            on boards the size of game's; the renderer is not used
+        workers (int, optional): Number of worker processes in parallel mode
+        seed (int): Seed of the first game in parallel mode
+        max_pieces (int, optional): Stop each game after this many pieces in parallel
+            mode, None to play until game over
         
     Returns:
         dict: Performance results
     """
     print(f"Starting performance test with {num_games} games...")
     
+    if parallel:
+        return run_batch(num_games, game.width, game.height, seed, workers, max_pieces, callback)
+    
     auto_player = AutoPlayer(game, renderer)
     results = auto_player.play_games(num_games, callback)
     